@@ -3,19 +3,31 @@ Telegram Bot - Personal Secretary for University Work
 Interactive button-based interface with conversation flows
 """
 
+from cachetools import TTLCache
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.request import HTTPXRequest
 from telegram.ext import (
+    AIORateLimiter,
     Application,
+    ApplicationHandlerStop,
+    BaseUpdateProcessor,
     CommandHandler,
     CallbackQueryHandler,
     ConversationHandler,
     MessageHandler,
     filters,
     ContextTypes,
+    InvalidCallbackData,
 )
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import lru_cache, partial
+from typing import Optional
+import asyncio
+import html
 import threading
-import os
+import time
+import weakref
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import config
 import notion_service
@@ -37,9 +49,8 @@ class HealthCheckHandler(BaseHTTPRequestHandler):
 
 
 def run_web_server():
-    port = int(os.environ.get('PORT', 10000))
-    server = HTTPServer(('0.0.0.0', port), HealthCheckHandler)
-    print(f"🌐 Health check server running on port {port}")
+    server = HTTPServer(('0.0.0.0', config.PORT), HealthCheckHandler)
+    print(f"🌐 Health check server running on port {config.PORT}")
     server.serve_forever()
 
 
@@ -47,13 +58,113 @@ def run_web_server():
 # HELPER FUNCTIONS
 # =============================================================================
 
+_STATUS_EMOJI = {
+    "Not started": "⚪",
+    "In progress": "🔵",
+    "Done": "✅"
+}
+
+
+_TYPE_EMOJI = {
+    "assignment": "📝",
+    "lab": "🔬",
+    "project": "🎯"
+}
+_DEFAULT_TYPE_EMOJI = "📝"
+
+
 def _status_emoji(status: str) -> str:
     """Return emoji based on status."""
-    return {
-        "Not started": "⚪",
-        "In progress": "🔵",
-        "Done": "✅"
-    }.get(status, "⚪")
+    return _STATUS_EMOJI.get(status, "⚪")
+
+
+def _render_item_card(item: dict, item_type: str) -> str:
+    """Build the item detail text (HTML) shown above the action keyboard."""
+    # User text is escaped so names like "lab_2 <draft>" can't break parsing
+    return (
+        f"{_TYPE_EMOJI.get(item_type, _DEFAULT_TYPE_EMOJI)} <b>{html.escape(item['name'])}</b>\n\n"
+        f"📚 Course: {html.escape(item['course_code'])}\n"
+        f"📅 Due: {item['due_date']}\n"
+        f"📌 Notes: {html.escape(item['notes']) if item['notes'] else 'None'}\n"
+        f"Status: {_status_emoji(item['status'])} {item['status']}\n\n"
+        f"What would you like to do?"
+    )
+
+
+async def _edit_if_changed(query, text: str, reply_markup=None, **kwargs):
+    """Edit the query's message unless it already shows this text and keyboard."""
+    message = query.message
+    # Telegram strips surrounding whitespace from the text it stores
+    if message is not None and message.text == text.strip() and message.reply_markup == reply_markup:
+        return message
+    return await query.edit_message_text(text, reply_markup=reply_markup, **kwargs)
+
+
+async def _send_saving_notice(update: Update):
+    """Show a placeholder while an item is saved; returns the message to edit."""
+    if update.callback_query:
+        return await update.callback_query.edit_message_text("⏳ Saving to Notion...")
+    return await update.message.reply_text("⏳ Saving to Notion...")
+
+
+# =============================================================================
+# COURSES CACHE
+# =============================================================================
+
+# Courses rarely change, so memoize the Notion result. The key is the cache
+# version (bumped when a course is added) plus a time window, so a new
+# version or window is simply a cache miss. Tuples are safe to share.
+_COURSE_VERSION = 0
+
+# Key last loaded into _courses_v; hits are served without a thread hop
+_courses_ready: Optional[tuple] = None
+
+# Fetch currently in flight; concurrent callers await it instead of issuing
+# their own Notion request.
+_courses_inflight: Optional[asyncio.Future] = None
+
+
+@lru_cache(maxsize=4)
+def _courses_v(version: int, window: int) -> tuple:
+    """Fetch courses from Notion, memoized per (version, window)."""
+    courses = tuple(notion_service.list_courses())
+    if not courses:
+        # list_courses returns [] on errors too; raising keeps lru_cache from
+        # memoizing it, so the next call asks Notion again
+        raise LookupError("no courses")
+    return courses
+
+
+async def _load_courses(key: tuple) -> tuple:
+    """Fill the memo for key from a worker thread."""
+    global _courses_inflight, _courses_ready
+    try:
+        courses = await asyncio.to_thread(_courses_v, *key)
+        _courses_ready = key
+        return courses
+    except LookupError:
+        return ()
+    finally:
+        _courses_inflight = None
+
+
+async def _get_courses_cached(max_age: float = 300) -> tuple:
+    """Return courses from the memo, refreshing from Notion when stale."""
+    global _courses_inflight
+    key = (_COURSE_VERSION, int(time.monotonic() // max_age))
+    if key == _courses_ready:
+        return _courses_v(*key)
+    
+    if _courses_inflight is None:
+        _courses_inflight = asyncio.ensure_future(_load_courses(key))
+    # Shield so one cancelled caller doesn't abort the shared fetch
+    return await asyncio.shield(_courses_inflight)
+
+
+def _invalidate_courses_cache():
+    """Bump the cache version so the next read hits Notion."""
+    global _COURSE_VERSION
+    _COURSE_VERSION += 1
 
 
 # =============================================================================
@@ -101,142 +212,202 @@ CONFIRM_DELETE = 58
 # Upcoming states
 UPCOMING_MENU = 60
 
+# Callback data prefixes (sliced off instead of str.replace)
+_COURSE_PREFIX_LEN = len("course_")
+_DATE_PREFIX_LEN = len("date_")
+
 
 # =============================================================================
 # KEYBOARD BUILDERS
 # =============================================================================
 
+# Static menus never change, so build them once at import time
+_BACK_ADD_BUTTON = InlineKeyboardButton("🔙 Back", callback_data="back_add")
+_BACK_LIST_BUTTON = InlineKeyboardButton("🔙 Back", callback_data="back_list")
+
+_MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("➕ Add", callback_data="menu_add"),
+        InlineKeyboardButton("📋 List", callback_data="menu_list"),
+        InlineKeyboardButton("📅 Upcoming", callback_data="menu_upcoming"),
+    ]
+])
+
+_ADD_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📝 Assignment", callback_data="add_assignment"),
+        InlineKeyboardButton("🔬 Lab", callback_data="add_lab"),
+    ],
+    [
+        InlineKeyboardButton("🎯 Project", callback_data="add_project"),
+        InlineKeyboardButton("📖 Course", callback_data="add_course"),
+    ],
+    [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
+])
+
+_LIST_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📝 Assignments", callback_data="list_assignments"),
+        InlineKeyboardButton("🔬 Labs", callback_data="list_labs"),
+    ],
+    [
+        InlineKeyboardButton("🎯 Projects", callback_data="list_projects"),
+        InlineKeyboardButton("📖 Courses", callback_data="list_courses"),
+    ],
+    [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
+])
+
+_UPCOMING_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("7 Days", callback_data="upcoming_7"),
+        InlineKeyboardButton("14 Days", callback_data="upcoming_14"),
+        InlineKeyboardButton("30 Days", callback_data="upcoming_30"),
+    ],
+    [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
+])
+
+_SKIP_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("⏭️ Skip", callback_data="skip"),
+        _BACK_ADD_BUTTON,
+    ]
+])
+
+_DONE_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("➕ Add Another", callback_data="menu_add"),
+        InlineKeyboardButton("📋 List", callback_data="menu_list"),
+    ],
+    [InlineKeyboardButton("🏠 Menu", callback_data="back_main")]
+])
+
+
 def main_menu_keyboard():
     """Build main menu keyboard."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("➕ Add", callback_data="menu_add"),
-            InlineKeyboardButton("📋 List", callback_data="menu_list"),
-            InlineKeyboardButton("📅 Upcoming", callback_data="menu_upcoming"),
-        ]
-    ])
+    return _MAIN_MENU_MARKUP
 
 
 def add_menu_keyboard():
     """Build add menu keyboard."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("📝 Assignment", callback_data="add_assignment"),
-            InlineKeyboardButton("🔬 Lab", callback_data="add_lab"),
-        ],
-        [
-            InlineKeyboardButton("🎯 Project", callback_data="add_project"),
-            InlineKeyboardButton("📖 Course", callback_data="add_course"),
-        ],
-        [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
-    ])
+    return _ADD_MENU_MARKUP
 
 
 def list_menu_keyboard():
     """Build list menu keyboard."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("📝 Assignments", callback_data="list_assignments"),
-            InlineKeyboardButton("🔬 Labs", callback_data="list_labs"),
-        ],
-        [
-            InlineKeyboardButton("🎯 Projects", callback_data="list_projects"),
-            InlineKeyboardButton("📖 Courses", callback_data="list_courses"),
-        ],
-        [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
-    ])
+    return _LIST_MENU_MARKUP
 
 
-def items_list_keyboard(items: list, item_type: str):
-    """Build keyboard with clickable items for status update."""
-    buttons = []
+def items_list_keyboard(items: list, item_type: str, done_callback: Optional[str] = None):
+    """
+    Build keyboard with clickable items for status update.
     
-    for item in items:
-        # Skip items without proper data
-        if not item.get('name') or item['name'] == "Untitled":
-            continue
-        
-        emoji = _status_emoji(item.get("status", "Not started"))
-        btn_text = f"{emoji} {item['name']} ({item['course_code']})"
-        # Truncate if too long (Telegram limit is 64 bytes for callback_data)
-        btn_data = f"{item_type}_{item['id'][:32]}"
-        buttons.append([InlineKeyboardButton(btn_text, callback_data=btn_data)])
-    
-    buttons.append([InlineKeyboardButton("🔙 Back", callback_data="back_list")])
-    
-    return InlineKeyboardMarkup(buttons)
+    With done_callback, add a button that lists finished items too.
+    """
+    status_emoji = _STATUS_EMOJI.get
+    # Arbitrary callback data: PTB keeps the tuple and sends Telegram a
+    # short token, so the full page ID fits despite the 64-byte limit
+    rows = [
+        [InlineKeyboardButton(
+            f"{status_emoji(item.get('status', 'Not started'), '⚪')} {item['name']} ({item['course_code']})",
+            callback_data=(item_type, item['id']),
+        )]
+        for item in items
+    ]
+    if done_callback:
+        rows.append([InlineKeyboardButton("✅ Show done too", callback_data=done_callback)])
+    rows.append([_BACK_LIST_BUTTON])
+    return InlineKeyboardMarkup(rows)
+
+
+def _action_data(action: str, item_type: str, item_id: str, arg: Optional[str] = None) -> tuple:
+    """Build the callback data tuple carried by an item action button."""
+    return (action, item_type, item_id, arg)
+
 
+def _parse_action(data) -> Optional[tuple]:
+    """Unpack item action callback data into (action, item_type, item_id, arg).
 
+    Returns None for plain string callbacks (back buttons) and for stale
+    tuples from other keyboards.
+    """
+    if isinstance(data, tuple) and len(data) == 4:
+        return data
+    return None
+
+
+# Memoized: the edit flows show the same item's keyboard again and again
+@lru_cache(maxsize=128)
 def item_action_keyboard(item_id: str, item_type: str):
     """Build keyboard for item actions (edit, delete, status)."""
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("⚪ Not Started", callback_data=f"status_{item_type}_{item_id}_Not started"),
-            InlineKeyboardButton("🔵 In Progress", callback_data=f"status_{item_type}_{item_id}_In progress"),
-            InlineKeyboardButton("✅ Done", callback_data=f"status_{item_type}_{item_id}_Done"),
+            InlineKeyboardButton("⚪ Not Started", callback_data=_action_data("status", item_type, item_id, "Not started")),
+            InlineKeyboardButton("🔵 In Progress", callback_data=_action_data("status", item_type, item_id, "In progress")),
+            InlineKeyboardButton("✅ Done", callback_data=_action_data("status", item_type, item_id, "Done")),
         ],
         [
-            InlineKeyboardButton("📅 Change Date", callback_data=f"editdate_{item_type}_{item_id}"),
-            InlineKeyboardButton("📚 Change Course", callback_data=f"editcourse_{item_type}_{item_id}"),
+            InlineKeyboardButton("📅 Change Date", callback_data=_action_data("editdate", item_type, item_id)),
+            InlineKeyboardButton("📚 Change Course", callback_data=_action_data("editcourse", item_type, item_id)),
         ],
         [
-            InlineKeyboardButton("✏️ Edit Notes", callback_data=f"editnotes_{item_type}_{item_id}"),
-            InlineKeyboardButton("🗑️ Delete", callback_data=f"delete_{item_type}_{item_id}"),
+            InlineKeyboardButton("✏️ Edit Notes", callback_data=_action_data("editnotes", item_type, item_id)),
+            InlineKeyboardButton("🗑️ Delete", callback_data=_action_data("delete", item_type, item_id)),
         ],
         [InlineKeyboardButton("🔙 Back", callback_data=f"back_{item_type}s")]
     ])
 
 
+@lru_cache(maxsize=128)
 def confirm_delete_keyboard(item_id: str, item_type: str):
     """Build confirmation keyboard for delete action."""
     return InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("✅ Yes, Delete", callback_data=f"confirmdelete_{item_type}_{item_id}"),
-            InlineKeyboardButton("❌ Cancel", callback_data=f"canceldelete_{item_type}_{item_id}"),
+            InlineKeyboardButton("✅ Yes, Delete", callback_data=_action_data("confirmdelete", item_type, item_id)),
+            InlineKeyboardButton("❌ Cancel", callback_data=_action_data("canceldelete", item_type, item_id)),
         ]
     ])
 
 
 def upcoming_menu_keyboard():
     """Build upcoming menu keyboard."""
+    return _UPCOMING_MENU_MARKUP
+
+
+@lru_cache(maxsize=4)
+def _courses_markup(version: int, window: int) -> InlineKeyboardMarkup:
+    """Build the course keyboard for one memoized course list."""
+    # One button per row (since names can be long); skip courses without a code
     return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("7 Days", callback_data="upcoming_7"),
-            InlineKeyboardButton("14 Days", callback_data="upcoming_14"),
-            InlineKeyboardButton("30 Days", callback_data="upcoming_30"),
-        ],
-        [InlineKeyboardButton("🔙 Back", callback_data="back_main")]
-    ])
+        [InlineKeyboardButton(f"{c['course_code']} - {c['name']}", callback_data=f"course_{c['course_code']}")]
+        for c in _courses_v(version, window)
+        if c['course_code']
+    ] + [[_BACK_ADD_BUTTON]])
 
 
-def courses_keyboard():
+async def courses_keyboard():
     """Build keyboard with courses from Notion."""
-    courses = notion_service.list_courses()
-    buttons = []
-    
-    # Create one button per row (since names can be long)
-    for course in courses:
-        # Skip empty courses (no name or no code)
-        if not course['name'] or course['name'] == "Untitled" or not course['course_code']:
-            continue
-            
-        btn_text = f"{course['course_code']} - {course['name']}"
-        btn_data = f"course_{course['course_code']}"
-        buttons.append([InlineKeyboardButton(btn_text, callback_data=btn_data)])
-    
-    # Add back button
-    buttons.append([InlineKeyboardButton("🔙 Back", callback_data="back_add")])
-    
-    return InlineKeyboardMarkup(buttons)
+    # Make sure the course list is loaded, then reuse the markup built for it
+    if not await _get_courses_cached():
+        return InlineKeyboardMarkup([[_BACK_ADD_BUTTON]])
+    return _courses_markup(*_courses_ready)
+
+
+# (day ordinal, markup): the date buttons only change when the day does
+_DATE_KB_CACHE = (-1, None)
 
 
 def date_keyboard():
     """Build date selection keyboard."""
-    today = datetime.now().date()
+    global _DATE_KB_CACHE
+    today = date.today()
+    ordinal = today.toordinal()
+    if _DATE_KB_CACHE[0] == ordinal:
+        return _DATE_KB_CACHE[1]
+    
     tomorrow = today + timedelta(days=1)
     next_week = today + timedelta(days=7)
     
-    return InlineKeyboardMarkup([
+    markup = InlineKeyboardMarkup([
         [
             InlineKeyboardButton(f"📅 Today ({today.strftime('%d/%m')})", callback_data=f"date_{today.isoformat()}"),
             InlineKeyboardButton(f"📅 Tomorrow ({tomorrow.strftime('%d/%m')})", callback_data=f"date_{tomorrow.isoformat()}"),
@@ -247,36 +418,31 @@ def date_keyboard():
         ],
         [InlineKeyboardButton("🔙 Back", callback_data="back_add")]
     ])
+    _DATE_KB_CACHE = (ordinal, markup)
+    return markup
 
 
 def skip_keyboard():
     """Build skip/back keyboard for optional fields."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("⏭️ Skip", callback_data="skip"),
-            InlineKeyboardButton("🔙 Back", callback_data="back_add"),
-        ]
-    ])
+    return _SKIP_MARKUP
 
 
 def done_keyboard():
     """Build keyboard shown after successful action."""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("➕ Add Another", callback_data="menu_add"),
-            InlineKeyboardButton("📋 List", callback_data="menu_list"),
-        ],
-        [InlineKeyboardButton("🏠 Menu", callback_data="back_main")]
-    ])
+    return _DONE_MARKUP
 
 
+@lru_cache(maxsize=None)
 def back_keyboard(callback_data: str):
-    """Build simple back button keyboard."""
+    """Build simple back button keyboard (one shared markup per target)."""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton("🔙 Back", callback_data=callback_data)]
     ])
 
 
+_BACK_ADD_MARKUP = back_keyboard("back_add")
+
+
 # =============================================================================
 # MAIN MENU HANDLERS
 # =============================================================================
@@ -296,22 +462,28 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return MAIN_MENU
 
 
+# Callback data -> (prompt, keyboard, next state)
+_MAIN_DISPATCH = {
+    "menu_add": ("What would you like to add?", _ADD_MENU_MARKUP, ADD_MENU),
+    "menu_list": ("What would you like to see?", _LIST_MENU_MARKUP, LIST_MENU),
+    "menu_upcoming": ("Show upcoming work for:", _UPCOMING_MENU_MARKUP, UPCOMING_MENU),
+}
+
+
 async def main_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle main menu button presses."""
     query = update.callback_query
     await query.answer()
     
     if query.data == "menu_add":
-        await query.edit_message_text("What would you like to add?", reply_markup=add_menu_keyboard())
-        return ADD_MENU
+        # Warm the courses cache while the user is still typing a name
+        context.application.create_task(_get_courses_cached(), update=update)
     
-    elif query.data == "menu_list":
-        await query.edit_message_text("What would you like to see?", reply_markup=list_menu_keyboard())
-        return LIST_MENU
-    
-    elif query.data == "menu_upcoming":
-        await query.edit_message_text("Show upcoming work for:", reply_markup=upcoming_menu_keyboard())
-        return UPCOMING_MENU
+    entry = _MAIN_DISPATCH.get(query.data)
+    if entry:
+        text, keyboard, next_state = entry
+        await query.edit_message_text(text, reply_markup=keyboard)
+        return next_state
     
     return MAIN_MENU
 
@@ -320,6 +492,14 @@ async def main_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ADD MENU HANDLERS
 # =============================================================================
 
+_ADD_DISPATCH = {
+    "add_assignment": ("📝 What's the assignment name?", _BACK_ADD_MARKUP, ADD_ASSIGNMENT_NAME),
+    "add_lab": ("🔬 What's the lab name?", _BACK_ADD_MARKUP, ADD_LAB_NAME),
+    "add_project": ("🎯 What's the project name?", _BACK_ADD_MARKUP, ADD_PROJECT_NAME),
+    "add_course": ("📖 What's the course name?", _BACK_ADD_MARKUP, ADD_COURSE_NAME),
+}
+
+
 async def add_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle add menu selections."""
     query = update.callback_query
@@ -328,21 +508,11 @@ async def add_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data == "back_main":
         return await start(update, context)
     
-    elif query.data == "add_assignment":
-        await query.edit_message_text("📝 What's the assignment name?", reply_markup=back_keyboard("back_add"))
-        return ADD_ASSIGNMENT_NAME
-    
-    elif query.data == "add_lab":
-        await query.edit_message_text("🔬 What's the lab name?", reply_markup=back_keyboard("back_add"))
-        return ADD_LAB_NAME
-    
-    elif query.data == "add_project":
-        await query.edit_message_text("🎯 What's the project name?", reply_markup=back_keyboard("back_add"))
-        return ADD_PROJECT_NAME
-    
-    elif query.data == "add_course":
-        await query.edit_message_text("📖 What's the course name?", reply_markup=back_keyboard("back_add"))
-        return ADD_COURSE_NAME
+    entry = _ADD_DISPATCH.get(query.data)
+    if entry:
+        text, keyboard, next_state = entry
+        await query.edit_message_text(text, reply_markup=keyboard)
+        return next_state
     
     return ADD_MENU
 
@@ -357,19 +527,19 @@ async def back_to_add_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # =============================================================================
-# ADD ASSIGNMENT FLOW
+# ADD ITEM NAME/COURSE STEPS (assignment, lab and project flows)
 # =============================================================================
 
-async def add_assignment_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle assignment name input."""
+async def add_item_name(update: Update, context: ContextTypes.DEFAULT_TYPE, *, key: str, next_state: int):
+    """Handle item name input and ask for the course."""
     if update.callback_query:
         if update.callback_query.data == "back_add":
             return await back_to_add_menu(update, context)
     
-    context.user_data["assignment_name"] = update.message.text
+    context.user_data[key] = update.message.text
     
     # Check if there are courses
-    courses = notion_service.list_courses()
+    courses = await _get_courses_cached()
     if not courses:
         await update.message.reply_text(
             "⚠️ No courses found in Notion!\n\nPlease add a course first.",
@@ -377,25 +547,32 @@ async def add_assignment_name(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ADD_MENU
     
-    await update.message.reply_text("📚 Select the course:", reply_markup=courses_keyboard())
-    return ADD_ASSIGNMENT_COURSE
+    await update.message.reply_text("📚 Select the course:", reply_markup=await courses_keyboard())
+    return next_state
 
 
-async def add_assignment_course(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle assignment course selection."""
+async def add_item_course(update: Update, context: ContextTypes.DEFAULT_TYPE, *, key: str, next_state: int):
+    """Handle item course selection and ask for the due date."""
     query = update.callback_query
     await query.answer()
     
     if query.data == "back_add":
         return await back_to_add_menu(update, context)
     
+    if not isinstance(query.data, str):
+        return None  # stale tuple button from an older message; stay in this state
+    
     # Extract course code from callback data (format: course_PHY202)
-    course_code = query.data.replace("course_", "")
-    context.user_data["assignment_course"] = course_code
+    course_code = query.data[_COURSE_PREFIX_LEN:]
+    context.user_data[key] = course_code
     
     await query.edit_message_text(f"📅 When is it due?\n\nCourse: {course_code}", reply_markup=date_keyboard())
-    return ADD_ASSIGNMENT_DATE
+    return next_state
+
 
+# =============================================================================
+# ADD ASSIGNMENT FLOW
+# =============================================================================
 
 async def add_assignment_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle assignment date selection."""
@@ -412,8 +589,11 @@ async def add_assignment_date(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         return ADD_ASSIGNMENT_DATE  # Stay in same state to receive text input
     
+    if not isinstance(query.data, str):
+        return ADD_ASSIGNMENT_DATE  # stale tuple button from an older message
+    
     # Extract date from callback data (format: date_2025-12-20)
-    due_date = query.data.replace("date_", "")
+    due_date = query.data[_DATE_PREFIX_LEN:]
     context.user_data["assignment_date"] = due_date
     
     await query.edit_message_text(
@@ -426,32 +606,6 @@ async def add_assignment_date(update: Update, context: ContextTypes.DEFAULT_TYPE
     return ADD_ASSIGNMENT_NOTES
 
 
-async def add_assignment_date_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle custom date text input for assignment."""
-    date_text = update.message.text.strip()
-    
-    # Validate date format
-    try:
-        datetime.strptime(date_text, "%Y-%m-%d")
-    except ValueError:
-        await update.message.reply_text(
-            "❌ Invalid date format. Please use YYYY-MM-DD\n\nExample: 2025-12-20",
-            reply_markup=back_keyboard("back_add")
-        )
-        return ADD_ASSIGNMENT_DATE
-    
-    context.user_data["assignment_date"] = date_text
-    
-    await update.message.reply_text(
-        f"📝 Any notes for this assignment?\n\n"
-        f"Name: {context.user_data['assignment_name']}\n"
-        f"Course: {context.user_data['assignment_course']}\n"
-        f"Due: {date_text}",
-        reply_markup=skip_keyboard()
-    )
-    return ADD_ASSIGNMENT_NOTES
-
-
 async def add_assignment_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle assignment notes input and save to Notion."""
     if update.callback_query:
@@ -468,31 +622,34 @@ async def add_assignment_notes(update: Update, context: ContextTypes.DEFAULT_TYP
     else:
         notes = update.message.text
     
-    # Save to Notion
-    result = notion_service.add_assignment(
-        name=context.user_data["assignment_name"],
-        course_code=context.user_data["assignment_course"],
-        due_date=context.user_data["assignment_date"],
+    payload = dict(context.user_data)
+    context.user_data.clear()
+    
+    # Notion write runs off the event loop while the notice is sent and the
+    # summary is built
+    save = asyncio.create_task(asyncio.to_thread(
+        notion_service.add_assignment,
+        name=payload["assignment_name"],
+        course_code=payload["assignment_course"],
+        due_date=payload["assignment_date"],
         notes=notes
+    ))
+    notice = asyncio.create_task(_send_saving_notice(update))
+    summary = (
+        f"📝 {payload['assignment_name']}\n"
+        f"📚 {payload['assignment_course']}\n"
+        f"📅 {payload['assignment_date']}\n"
+        f"📌 {notes if notes else 'No notes'}"
     )
+    result = await save
+    message = await notice
     
     if result["success"]:
-        response = (
-            f"✅ Assignment added!\n\n"
-            f"📝 {context.user_data['assignment_name']}\n"
-            f"📚 {context.user_data['assignment_course']}\n"
-            f"📅 {context.user_data['assignment_date']}\n"
-            f"📌 {notes if notes else 'No notes'}"
-        )
+        response = "✅ Assignment added!\n\n" + summary
     else:
         response = f"❌ Error: {result['message']}"
     
-    context.user_data.clear()
-    
-    if update.callback_query:
-        await update.callback_query.edit_message_text(response, reply_markup=done_keyboard())
-    else:
-        await update.message.reply_text(response, reply_markup=done_keyboard())
+    await message.edit_text(response, reply_markup=done_keyboard())
     
     return MAIN_MENU
 
@@ -501,41 +658,6 @@ async def add_assignment_notes(update: Update, context: ContextTypes.DEFAULT_TYP
 # ADD LAB FLOW
 # =============================================================================
 
-async def add_lab_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle lab name input."""
-    if update.callback_query:
-        if update.callback_query.data == "back_add":
-            return await back_to_add_menu(update, context)
-    
-    context.user_data["lab_name"] = update.message.text
-    
-    courses = notion_service.list_courses()
-    if not courses:
-        await update.message.reply_text(
-            "⚠️ No courses found! Please add a course first.",
-            reply_markup=add_menu_keyboard()
-        )
-        return ADD_MENU
-    
-    await update.message.reply_text("📚 Select the course:", reply_markup=courses_keyboard())
-    return ADD_LAB_COURSE
-
-
-async def add_lab_course(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle lab course selection."""
-    query = update.callback_query
-    await query.answer()
-    
-    if query.data == "back_add":
-        return await back_to_add_menu(update, context)
-    
-    course_code = query.data.replace("course_", "")
-    context.user_data["lab_course"] = course_code
-    
-    await query.edit_message_text(f"📅 When is it due?", reply_markup=date_keyboard())
-    return ADD_LAB_DATE
-
-
 async def add_lab_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle lab date selection."""
     query = update.callback_query
@@ -551,31 +673,16 @@ async def add_lab_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return ADD_LAB_DATE
     
-    due_date = query.data.replace("date_", "")
+    if not isinstance(query.data, str):
+        return ADD_LAB_DATE  # stale tuple button from an older message
+    
+    due_date = query.data[_DATE_PREFIX_LEN:]
     context.user_data["lab_date"] = due_date
     
     await query.edit_message_text("📋 Lab description? (or skip)", reply_markup=skip_keyboard())
     return ADD_LAB_DESCRIPTION
 
 
-async def add_lab_date_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle custom date text input for lab."""
-    date_text = update.message.text.strip()
-    
-    try:
-        datetime.strptime(date_text, "%Y-%m-%d")
-    except ValueError:
-        await update.message.reply_text(
-            "❌ Invalid format. Use YYYY-MM-DD",
-            reply_markup=back_keyboard("back_add")
-        )
-        return ADD_LAB_DATE
-    
-    context.user_data["lab_date"] = date_text
-    await update.message.reply_text("📋 Lab description? (or skip)", reply_markup=skip_keyboard())
-    return ADD_LAB_DESCRIPTION
-
-
 async def add_lab_description(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle lab description input."""
     if update.callback_query:
@@ -613,30 +720,34 @@ async def add_lab_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         notes = update.message.text
     
-    result = notion_service.add_lab(
-        name=context.user_data["lab_name"],
-        course_code=context.user_data["lab_course"],
-        due_date=context.user_data["lab_date"],
-        description=context.user_data.get("lab_description", ""),
+    payload = dict(context.user_data)
+    context.user_data.clear()
+    
+    # Notion write runs off the event loop while the notice is sent and the
+    # summary is built
+    save = asyncio.create_task(asyncio.to_thread(
+        notion_service.add_lab,
+        name=payload["lab_name"],
+        course_code=payload["lab_course"],
+        due_date=payload["lab_date"],
+        description=payload.get("lab_description", ""),
         notes=notes
+    ))
+    notice = asyncio.create_task(_send_saving_notice(update))
+    summary = (
+        f"🔬 {payload['lab_name']}\n"
+        f"📚 {payload['lab_course']}\n"
+        f"📅 {payload['lab_date']}"
     )
+    result = await save
+    message = await notice
     
     if result["success"]:
-        response = (
-            f"✅ Lab added!\n\n"
-            f"🔬 {context.user_data['lab_name']}\n"
-            f"📚 {context.user_data['lab_course']}\n"
-            f"📅 {context.user_data['lab_date']}"
-        )
+        response = "✅ Lab added!\n\n" + summary
     else:
         response = f"❌ Error: {result['message']}"
     
-    context.user_data.clear()
-    
-    if update.callback_query:
-        await update.callback_query.edit_message_text(response, reply_markup=done_keyboard())
-    else:
-        await update.message.reply_text(response, reply_markup=done_keyboard())
+    await message.edit_text(response, reply_markup=done_keyboard())
     
     return MAIN_MENU
 
@@ -645,41 +756,6 @@ async def add_lab_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ADD PROJECT FLOW
 # =============================================================================
 
-async def add_project_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle project name input."""
-    if update.callback_query:
-        if update.callback_query.data == "back_add":
-            return await back_to_add_menu(update, context)
-    
-    context.user_data["project_name"] = update.message.text
-    
-    courses = notion_service.list_courses()
-    if not courses:
-        await update.message.reply_text(
-            "⚠️ No courses found! Please add a course first.",
-            reply_markup=add_menu_keyboard()
-        )
-        return ADD_MENU
-    
-    await update.message.reply_text("📚 Select the course:", reply_markup=courses_keyboard())
-    return ADD_PROJECT_COURSE
-
-
-async def add_project_course(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle project course selection."""
-    query = update.callback_query
-    await query.answer()
-    
-    if query.data == "back_add":
-        return await back_to_add_menu(update, context)
-    
-    course_code = query.data.replace("course_", "")
-    context.user_data["project_course"] = course_code
-    
-    await query.edit_message_text("📅 When is it due?", reply_markup=date_keyboard())
-    return ADD_PROJECT_DATE
-
-
 async def add_project_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle project date selection."""
     query = update.callback_query
@@ -695,31 +771,16 @@ async def add_project_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return ADD_PROJECT_DATE
     
-    due_date = query.data.replace("date_", "")
+    if not isinstance(query.data, str):
+        return ADD_PROJECT_DATE  # stale tuple button from an older message
+    
+    due_date = query.data[_DATE_PREFIX_LEN:]
     context.user_data["project_date"] = due_date
     
     await query.edit_message_text("📝 Any notes?", reply_markup=skip_keyboard())
     return ADD_PROJECT_NOTES
 
 
-async def add_project_date_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle custom date text input for project."""
-    date_text = update.message.text.strip()
-    
-    try:
-        datetime.strptime(date_text, "%Y-%m-%d")
-    except ValueError:
-        await update.message.reply_text(
-            "❌ Invalid format. Use YYYY-MM-DD",
-            reply_markup=back_keyboard("back_add")
-        )
-        return ADD_PROJECT_DATE
-    
-    context.user_data["project_date"] = date_text
-    await update.message.reply_text("📝 Any notes?", reply_markup=skip_keyboard())
-    return ADD_PROJECT_NOTES
-
-
 async def add_project_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle project notes and save to Notion."""
     if update.callback_query:
@@ -736,33 +797,75 @@ async def add_project_notes(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         notes = update.message.text
     
-    result = notion_service.add_project(
-        name=context.user_data["project_name"],
-        course_code=context.user_data["project_course"],
-        due_date=context.user_data["project_date"],
+    payload = dict(context.user_data)
+    context.user_data.clear()
+    
+    # Notion write runs off the event loop while the notice is sent and the
+    # summary is built
+    save = asyncio.create_task(asyncio.to_thread(
+        notion_service.add_project,
+        name=payload["project_name"],
+        course_code=payload["project_course"],
+        due_date=payload["project_date"],
         notes=notes
+    ))
+    notice = asyncio.create_task(_send_saving_notice(update))
+    summary = (
+        f"🎯 {payload['project_name']}\n"
+        f"📚 {payload['project_course']}\n"
+        f"📅 {payload['project_date']}"
     )
+    result = await save
+    message = await notice
     
     if result["success"]:
-        response = (
-            f"✅ Project added!\n\n"
-            f"🎯 {context.user_data['project_name']}\n"
-            f"📚 {context.user_data['project_course']}\n"
-            f"📅 {context.user_data['project_date']}"
-        )
+        response = "✅ Project added!\n\n" + summary
     else:
         response = f"❌ Error: {result['message']}"
     
-    context.user_data.clear()
-    
-    if update.callback_query:
-        await update.callback_query.edit_message_text(response, reply_markup=done_keyboard())
-    else:
-        await update.message.reply_text(response, reply_markup=done_keyboard())
+    await message.edit_text(response, reply_markup=done_keyboard())
     
     return MAIN_MENU
 
 
+# =============================================================================
+# CUSTOM DATE INPUT (assignment, lab and project flows)
+# =============================================================================
+
+# Date state -> (user_data key, next prompt, next state). The prompt is
+# formatted with user_data so it can echo what was entered so far.
+_DATE_FLOWS = {
+    ADD_ASSIGNMENT_DATE: (
+        "assignment_date",
+        "📝 Any notes for this assignment?\n\n"
+        "Name: {assignment_name}\n"
+        "Course: {assignment_course}\n"
+        "Due: {assignment_date}",
+        ADD_ASSIGNMENT_NOTES,
+    ),
+    ADD_LAB_DATE: ("lab_date", "📋 Lab description? (or skip)", ADD_LAB_DESCRIPTION),
+    ADD_PROJECT_DATE: ("project_date", "📝 Any notes?", ADD_PROJECT_NOTES),
+}
+
+
+async def add_date_text(update: Update, context: ContextTypes.DEFAULT_TYPE, *, state: int):
+    """Handle custom date text input for assignment, lab and project flows."""
+    key, prompt, next_state = _DATE_FLOWS[state]
+    date_text = update.message.text.strip()
+    
+    if not notion_service.is_valid_date(date_text):
+        await update.message.reply_text(
+            "❌ Invalid date format. Please use YYYY-MM-DD\n\nExample: 2025-12-20",
+            reply_markup=back_keyboard("back_add")
+        )
+        return state
+    
+    context.user_data[key] = date_text
+    
+    await update.message.reply_text(prompt.format(**context.user_data), reply_markup=skip_keyboard())
+    return next_state
+
+
 # =============================================================================
 # ADD COURSE FLOW
 # =============================================================================
@@ -844,32 +947,37 @@ async def add_course_ects(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ Please enter a number", reply_markup=skip_keyboard())
             return ADD_COURSE_ECTS
     
-    result = notion_service.add_course(
-        name=context.user_data["course_name"],
-        course_code=context.user_data["course_code"],
-        semester=context.user_data["course_semester"],
-        professor=context.user_data.get("course_professor", ""),
+    payload = dict(context.user_data)
+    context.user_data.clear()
+    
+    # Notion write runs off the event loop while the notice is sent and the
+    # summary is built
+    save = asyncio.create_task(asyncio.to_thread(
+        notion_service.add_course,
+        name=payload["course_name"],
+        course_code=payload["course_code"],
+        semester=payload["course_semester"],
+        professor=payload.get("course_professor", ""),
         ects=ects
+    ))
+    notice = asyncio.create_task(_send_saving_notice(update))
+    summary = (
+        f"📖 {payload['course_name']}\n"
+        f"🔤 {payload['course_code']}\n"
+        f"📅 Semester {payload['course_semester']}\n"
+        f"👨‍🏫 {payload.get('course_professor', 'N/A')}\n"
+        f"🎓 {ects} ECTS"
     )
+    result = await save
+    message = await notice
     
     if result["success"]:
-        response = (
-            f"✅ Course added!\n\n"
-            f"📖 {context.user_data['course_name']}\n"
-            f"🔤 {context.user_data['course_code']}\n"
-            f"📅 Semester {context.user_data['course_semester']}\n"
-            f"👨‍🏫 {context.user_data.get('course_professor', 'N/A')}\n"
-            f"🎓 {ects} ECTS"
-        )
+        _invalidate_courses_cache()
+        response = "✅ Course added!\n\n" + summary
     else:
         response = f"❌ Error: {result['message']}"
     
-    context.user_data.clear()
-    
-    if update.callback_query:
-        await update.callback_query.edit_message_text(response, reply_markup=done_keyboard())
-    else:
-        await update.message.reply_text(response, reply_markup=done_keyboard())
+    await message.edit_text(response, reply_markup=done_keyboard())
     
     return MAIN_MENU
 
@@ -878,6 +986,61 @@ async def add_course_ects(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # LIST HANDLERS
 # =============================================================================
 
+# List name -> (fetch function, item type, header, select state)
+_ITEM_LISTS = {
+    "assignments": (notion_service.list_assignments, "assignment", "📝 Your Assignments:\n\nTap one to change its status:", LIST_ASSIGNMENTS_SELECT),
+    "labs": (notion_service.list_labs, "lab", "🔬 Your Labs:\n\nTap one to change its status:", LIST_LABS_SELECT),
+    "projects": (notion_service.list_projects, "project", "🎯 Your Projects:\n\nTap one to change its status:", LIST_PROJECTS_SELECT),
+}
+
+# Callback data -> list name, for the list menu and the item "Back" buttons
+_LIST_CALLBACKS = {f"list_{name}": name for name in _ITEM_LISTS}
+_BACK_LIST_CALLBACKS = {f"back_{name}": name for name in _ITEM_LISTS}
+_DONE_LIST_CALLBACKS = {f"done_{name}": name for name in _ITEM_LISTS}
+
+
+async def _show_item_list(query, context, name: str, reuse: bool = False, include_done: bool = False) -> int:
+    """
+    Show the selectable list of assignments, labs or projects.
+    
+    Only open items are listed unless include_done is set (the "Show done
+    too" button). With reuse, show the list this chat was shown last instead
+    of fetching it again (used by the "Back" button on an item).
+    """
+    list_function, item_type, header, state = _ITEM_LISTS[name]
+    last_key = f"last_list_{name}"
+    last = context.user_data.get(last_key) if reuse else None
+    if last is None:
+        items = await asyncio.to_thread(list_function, use_cache=reuse, include_done=include_done)
+        last = context.user_data[last_key] = (items, include_done)
+    items, include_done = last
+    if not items and include_done:
+        await _edit_if_changed(query, f"📭 No {name} found.", reply_markup=list_menu_keyboard())
+        return LIST_MENU
+    
+    # Finished items are one tap away, so they can still be reopened
+    done_callback = None if include_done else f"done_{name}"
+    text = header if items else f"📭 No open {name}."
+    await _edit_if_changed(query, text, reply_markup=items_list_keyboard(items, item_type, done_callback))
+    return state
+
+
+async def _show_courses(query) -> int:
+    """Show courses as text (they have no actions)."""
+    items = await asyncio.to_thread(notion_service.list_courses)
+    if not items:
+        text = "📭 No courses found."
+    else:
+        text = "📖 Your Courses:\n\n" + "".join(
+            f"📚 {item['name']} ({item['course_code']})\n"
+            f"   Semester {item['semester']} | {item['ects']} ECTS\n\n"
+            for item in items
+        )
+    
+    await _edit_if_changed(query, text, reply_markup=list_menu_keyboard())
+    return LIST_MENU
+
+
 async def list_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle list menu selections."""
     query = update.callback_query
@@ -886,302 +1049,154 @@ async def list_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data == "back_main":
         return await start(update, context)
     
-    if query.data == "list_assignments":
-        items = notion_service.list_assignments()
-        if not items:
-            await query.edit_message_text("📭 No assignments found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        # Filter out empty items
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-        
-        if not items:
-            await query.edit_message_text("📭 No assignments found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        await query.edit_message_text(
-            "📝 Your Assignments:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "assignment")
-        )
-        return LIST_ASSIGNMENTS_SELECT
+    if query.data == "list_courses":
+        return await _show_courses(query)
     
-    elif query.data == "list_labs":
-        items = notion_service.list_labs()
-        if not items:
-            await query.edit_message_text("📭 No labs found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-        
-        if not items:
-            await query.edit_message_text("📭 No labs found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        await query.edit_message_text(
-            "🔬 Your Labs:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "lab")
-        )
-        return LIST_LABS_SELECT
-    
-    elif query.data == "list_projects":
-        items = notion_service.list_projects()
-        if not items:
-            await query.edit_message_text("📭 No projects found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-        
-        if not items:
-            await query.edit_message_text("📭 No projects found.", reply_markup=list_menu_keyboard())
-            return LIST_MENU
-        
-        await query.edit_message_text(
-            "🎯 Your Projects:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "project")
-        )
-        return LIST_PROJECTS_SELECT
-    
-    elif query.data == "list_courses":
-        items = notion_service.list_courses()
-        if not items:
-            text = "📭 No courses found."
-        else:
-            items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-            text = "📖 Your Courses:\n\n"
-            for item in items:
-                text += f"📚 {item['name']} ({item['course_code']})\n"
-                text += f"   Semester {item['semester']} | {item['ects']} ECTS\n\n"
-        
-        await query.edit_message_text(text, reply_markup=list_menu_keyboard())
-        return LIST_MENU
+    name = _LIST_CALLBACKS.get(query.data)
+    if name:
+        return await _show_item_list(query, context, name)
     
     return LIST_MENU
 
 
-async def list_assignments_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle assignment selection for status update."""
+async def list_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, *, state: int):
+    """Handle item selection from an assignment, lab or project list."""
     query = update.callback_query
     await query.answer()
     
     if query.data == "back_list":
-        await query.edit_message_text("What would you like to see?", reply_markup=list_menu_keyboard())
+        await _edit_if_changed(query, "What would you like to see?", reply_markup=list_menu_keyboard())
         return LIST_MENU
     
-    if query.data.startswith("assignment_"):
-        item_id = query.data.replace("assignment_", "")
+    name = _DONE_LIST_CALLBACKS.get(query.data)
+    if name:
+        return await _show_item_list(query, context, name, include_done=True)
+    
+    # List buttons carry (item_type, page_id); 4-tuples from older item cards
+    # and strings from other keyboards are ignored
+    if isinstance(query.data, tuple) and len(query.data) == 2:
+        item_type, item_id = query.data
         
-        # Find the full item details
-        items = notion_service.list_assignments()
-        item = None
-        for i in items:
-            if i['id'].startswith(item_id):
-                item = i
-                context.user_data["selected_item_id"] = i['id']
-                context.user_data["selected_item_type"] = "assignment"
-                break
+        # The list was fetched moments ago, so this is a dict lookup
+        item = await asyncio.to_thread(notion_service.get_cached_item, item_type, item_id)
         
         if item:
-            emoji = _status_emoji(item['status'])
-            text = (
-                f"📝 *{item['name']}*\n\n"
-                f"📚 Course: {item['course_code']}\n"
-                f"📅 Due: {item['due_date']}\n"
-                f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                f"Status: {emoji} {item['status']}\n\n"
-                f"What would you like to do?"
-            )
+            context.user_data["selected_item_id"] = item_id
+            context.user_data["selected_item_type"] = item_type
             await query.edit_message_text(
-                text,
-                reply_markup=item_action_keyboard(item_id, "assignment"),
-                parse_mode="Markdown"
+                _render_item_card(item, item_type),
+                reply_markup=item_action_keyboard(item_id, item_type),
+                parse_mode="HTML"
             )
         else:
             await query.edit_message_text("❌ Item not found", reply_markup=list_menu_keyboard())
         
         return ITEM_ACTION
     
-    return LIST_ASSIGNMENTS_SELECT
+    return state
 
 
-async def list_labs_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle lab selection for status update."""
-    query = update.callback_query
-    await query.answer()
+async def _action_status(query, context, item_type: str, item_id: str, new_status: str) -> int:
+    """Set the item's status and finish."""
+    result = await asyncio.to_thread(notion_service.update_status, item_id, new_status)
     
-    if query.data == "back_list":
-        await query.edit_message_text("What would you like to see?", reply_markup=list_menu_keyboard())
-        return LIST_MENU
-    
-    if query.data.startswith("lab_"):
-        item_id = query.data.replace("lab_", "")
-        
-        items = notion_service.list_labs()
-        item = None
-        for i in items:
-            if i['id'].startswith(item_id):
-                item = i
-                context.user_data["selected_item_id"] = i['id']
-                context.user_data["selected_item_type"] = "lab"
-                break
-        
-        if item:
-            emoji = _status_emoji(item['status'])
-            text = (
-                f"🔬 *{item['name']}*\n\n"
-                f"📚 Course: {item['course_code']}\n"
-                f"📅 Due: {item['due_date']}\n"
-                f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                f"Status: {emoji} {item['status']}\n\n"
-                f"What would you like to do?"
-            )
-            await query.edit_message_text(
-                text,
-                reply_markup=item_action_keyboard(item_id, "lab"),
-                parse_mode="Markdown"
-            )
-        else:
-            await query.edit_message_text("❌ Item not found", reply_markup=list_menu_keyboard())
-        
-        return ITEM_ACTION
+    if result["success"]:
+        emoji = _status_emoji(new_status)
+        await query.edit_message_text(
+            f"✅ Status updated to {emoji} {new_status}!",
+            reply_markup=done_keyboard()
+        )
+    else:
+        await query.edit_message_text(
+            f"❌ Error: {result['message']}",
+            reply_markup=done_keyboard()
+        )
     
-    return LIST_LABS_SELECT
+    context.user_data.clear()
+    return MAIN_MENU
+
+
+async def _action_edit_date(query, context, item_type: str, item_id: str, arg) -> int:
+    """Ask for the new due date."""
+    await query.edit_message_text(
+        "📅 Select new due date:",
+        reply_markup=date_keyboard()
+    )
+    return EDIT_DATE
+
+
+async def _action_edit_course(query, context, item_type: str, item_id: str, arg) -> int:
+    """Ask for the new course."""
+    await query.edit_message_text(
+        "📚 Select new course:",
+        reply_markup=await courses_keyboard()
+    )
+    return EDIT_COURSE
+
 
+async def _action_edit_notes(query, context, item_type: str, item_id: str, arg) -> int:
+    """Ask for the new notes."""
+    await query.edit_message_text(
+        "✏️ Type new notes (or send empty message to clear):",
+        reply_markup=back_keyboard("back_action")
+    )
+    return EDIT_NOTES
 
-async def list_projects_select_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle project selection for status update."""
+
+async def _action_delete(query, context, item_type: str, item_id: str, arg) -> int:
+    """Ask for delete confirmation."""
+    await query.edit_message_text(
+        "⚠️ Are you sure you want to delete this item?\n\nThis cannot be undone!",
+        reply_markup=confirm_delete_keyboard(item_id, item_type)
+    )
+    return CONFIRM_DELETE
+
+
+_ITEM_ACTION_DISPATCH = {
+    "status": _action_status,
+    "editdate": _action_edit_date,
+    "editcourse": _action_edit_course,
+    "editnotes": _action_edit_notes,
+    "delete": _action_delete,
+}
+
+
+async def item_action_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle item actions (status, edit, delete)."""
     query = update.callback_query
     await query.answer()
     
-    if query.data == "back_list":
-        await query.edit_message_text("What would you like to see?", reply_markup=list_menu_keyboard())
-        return LIST_MENU
+    parsed = _parse_action(query.data)
+    if parsed is None:
+        # Handle back buttons (back_assignments, back_labs, back_projects)
+        name = _BACK_LIST_CALLBACKS.get(query.data)
+        if name:
+            return await _show_item_list(query, context, name, reuse=True)
+        return ITEM_ACTION
     
-    if query.data.startswith("project_"):
-        item_id = query.data.replace("project_", "")
-        
-        items = notion_service.list_projects()
-        item = None
-        for i in items:
-            if i['id'].startswith(item_id):
-                item = i
-                context.user_data["selected_item_id"] = i['id']
-                context.user_data["selected_item_type"] = "project"
-                break
-        
-        if item:
-            emoji = _status_emoji(item['status'])
-            text = (
-                f"🎯 *{item['name']}*\n\n"
-                f"📚 Course: {item['course_code']}\n"
-                f"📅 Due: {item['due_date']}\n"
-                f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                f"Status: {emoji} {item['status']}\n\n"
-                f"What would you like to do?"
-            )
-            await query.edit_message_text(
-                text,
-                reply_markup=item_action_keyboard(item_id, "project"),
-                parse_mode="Markdown"
-            )
-        else:
-            await query.edit_message_text("❌ Item not found", reply_markup=list_menu_keyboard())
-        
+    action, item_type, item_id, arg = parsed
+    handler = _ITEM_ACTION_DISPATCH.get(action)
+    if handler is None:
         return ITEM_ACTION
     
-    return LIST_PROJECTS_SELECT
+    # The button carries the item, so later edit steps read it from here
+    context.user_data["selected_item_id"] = item_id
+    context.user_data["selected_item_type"] = item_type
+    return await handler(query, context, item_type, item_id, arg)
 
 
-async def item_action_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle item actions (status, edit, delete)."""
-    query = update.callback_query
-    await query.answer()
-    
+async def _back_to_item_action(query, context) -> int:
+    """Show the selected item's card and actions again."""
     item_id = context.user_data.get("selected_item_id", "")
     item_type = context.user_data.get("selected_item_type", "")
-    
-    # Handle back buttons
-    if query.data == "back_assignments":
-        items = notion_service.list_assignments()
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-        await query.edit_message_text(
-            "📝 Your Assignments:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "assignment")
-        )
-        return LIST_ASSIGNMENTS_SELECT
-    
-    elif query.data == "back_labs":
-        items = notion_service.list_labs()
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
+    # Usually a dict lookup in the list cache; fetched by ID otherwise
+    item = await asyncio.to_thread(notion_service.get_cached_item, item_type, item_id)
+    if item:
         await query.edit_message_text(
-            "🔬 Your Labs:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "lab")
+            _render_item_card(item, item_type),
+            reply_markup=item_action_keyboard(item_id, item_type),
+            parse_mode="HTML"
         )
-        return LIST_LABS_SELECT
-    
-    elif query.data == "back_projects":
-        items = notion_service.list_projects()
-        items = [i for i in items if i.get('name') and i['name'] != "Untitled"]
-        await query.edit_message_text(
-            "🎯 Your Projects:\n\nTap one to change its status:",
-            reply_markup=items_list_keyboard(items, "project")
-        )
-        return LIST_PROJECTS_SELECT
-    
-    # Handle status update
-    if query.data.startswith("status_"):
-        parts = query.data.split("_", 3)
-        if len(parts) >= 4:
-            new_status = parts[3]
-            
-            result = notion_service.update_status(item_id, new_status)
-            
-            if result["success"]:
-                emoji = _status_emoji(new_status)
-                await query.edit_message_text(
-                    f"✅ Status updated to {emoji} {new_status}!",
-                    reply_markup=done_keyboard()
-                )
-            else:
-                await query.edit_message_text(
-                    f"❌ Error: {result['message']}",
-                    reply_markup=done_keyboard()
-                )
-            
-            context.user_data.clear()
-            return MAIN_MENU
-    
-    # Handle edit due date
-    if query.data.startswith("editdate_"):
-        await query.edit_message_text(
-            "📅 Select new due date:",
-            reply_markup=date_keyboard()
-        )
-        return EDIT_DATE
-    
-    # Handle edit course
-    if query.data.startswith("editcourse_"):
-        await query.edit_message_text(
-            "📚 Select new course:",
-            reply_markup=courses_keyboard()
-        )
-        return EDIT_COURSE
-    
-    # Handle edit notes
-    if query.data.startswith("editnotes_"):
-        await query.edit_message_text(
-            "✏️ Type new notes (or send empty message to clear):",
-            reply_markup=back_keyboard("back_action")
-        )
-        return EDIT_NOTES
-    
-    # Handle delete
-    if query.data.startswith("delete_"):
-        await query.edit_message_text(
-            "⚠️ Are you sure you want to delete this item?\n\nThis cannot be undone!",
-            reply_markup=confirm_delete_keyboard(item_id, item_type)
-        )
-        return CONFIRM_DELETE
-    
     return ITEM_ACTION
 
 
@@ -1189,31 +1204,12 @@ async def edit_date_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle due date edit."""
     query = update.callback_query
     item_id = context.user_data.get("selected_item_id", "")
-    item_type = context.user_data.get("selected_item_type", "")
     
     if query:
         await query.answer()
         
         if query.data == "back_add":
-            # Go back to item action menu
-            item = notion_service.get_item_by_id(item_id)
-            if item:
-                emoji = _status_emoji(item['status'])
-                type_emoji = {"assignment": "📝", "lab": "🔬", "project": "🎯"}.get(item_type, "📝")
-                text = (
-                    f"{type_emoji} *{item['name']}*\n\n"
-                    f"📚 Course: {item['course_code']}\n"
-                    f"📅 Due: {item['due_date']}\n"
-                    f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                    f"Status: {emoji} {item['status']}\n\n"
-                    f"What would you like to do?"
-                )
-                await query.edit_message_text(
-                    text,
-                    reply_markup=item_action_keyboard(item_id[:32], item_type),
-                    parse_mode="Markdown"
-                )
-            return ITEM_ACTION
+            return await _back_to_item_action(query, context)
         
         if query.data == "date_custom":
             await query.edit_message_text(
@@ -1222,9 +1218,9 @@ async def edit_date_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return EDIT_DATE
         
-        if query.data.startswith("date_"):
-            new_date = query.data.replace("date_", "")
-            result = notion_service.update_due_date(item_id, new_date)
+        if isinstance(query.data, str) and query.data.startswith("date_"):
+            new_date = query.data[_DATE_PREFIX_LEN:]
+            result = await asyncio.to_thread(notion_service.update_due_date, item_id, new_date)
             
             if result["success"]:
                 await query.edit_message_text(
@@ -1248,16 +1244,14 @@ async def edit_date_text_handler(update: Update, context: ContextTypes.DEFAULT_T
     date_text = update.message.text.strip()
     item_id = context.user_data.get("selected_item_id", "")
     
-    try:
-        datetime.strptime(date_text, "%Y-%m-%d")
-    except ValueError:
+    if not notion_service.is_valid_date(date_text):
         await update.message.reply_text(
             "❌ Invalid format. Use YYYY-MM-DD (e.g., 2025-12-20)",
             reply_markup=back_keyboard("back_add")
         )
         return EDIT_DATE
     
-    result = notion_service.update_due_date(item_id, date_text)
+    result = await asyncio.to_thread(notion_service.update_due_date, item_id, date_text)
     
     if result["success"]:
         await update.message.reply_text(
@@ -1280,31 +1274,13 @@ async def edit_course_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
     
     item_id = context.user_data.get("selected_item_id", "")
-    item_type = context.user_data.get("selected_item_type", "")
     
     if query.data == "back_add":
-        item = notion_service.get_item_by_id(item_id)
-        if item:
-            emoji = _status_emoji(item['status'])
-            type_emoji = {"assignment": "📝", "lab": "🔬", "project": "🎯"}.get(item_type, "📝")
-            text = (
-                f"{type_emoji} *{item['name']}*\n\n"
-                f"📚 Course: {item['course_code']}\n"
-                f"📅 Due: {item['due_date']}\n"
-                f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                f"Status: {emoji} {item['status']}\n\n"
-                f"What would you like to do?"
-            )
-            await query.edit_message_text(
-                text,
-                reply_markup=item_action_keyboard(item_id[:32], item_type),
-                parse_mode="Markdown"
-            )
-        return ITEM_ACTION
+        return await _back_to_item_action(query, context)
     
-    if query.data.startswith("course_"):
-        new_course = query.data.replace("course_", "")
-        result = notion_service.update_course(item_id, new_course)
+    if isinstance(query.data, str) and query.data.startswith("course_"):
+        new_course = query.data[_COURSE_PREFIX_LEN:]
+        result = await asyncio.to_thread(notion_service.update_course, item_id, new_course)
         
         if result["success"]:
             await query.edit_message_text(
@@ -1330,26 +1306,7 @@ async def edit_notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.answer()
         
         if query.data == "back_action":
-            item_id = context.user_data.get("selected_item_id", "")
-            item_type = context.user_data.get("selected_item_type", "")
-            item = notion_service.get_item_by_id(item_id)
-            if item:
-                emoji = _status_emoji(item['status'])
-                type_emoji = {"assignment": "📝", "lab": "🔬", "project": "🎯"}.get(item_type, "📝")
-                text = (
-                    f"{type_emoji} *{item['name']}*\n\n"
-                    f"📚 Course: {item['course_code']}\n"
-                    f"📅 Due: {item['due_date']}\n"
-                    f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                    f"Status: {emoji} {item['status']}\n\n"
-                    f"What would you like to do?"
-                )
-                await query.edit_message_text(
-                    text,
-                    reply_markup=item_action_keyboard(item_id[:32], item_type),
-                    parse_mode="Markdown"
-                )
-            return ITEM_ACTION
+            return await _back_to_item_action(query, context)
         
         return EDIT_NOTES
     
@@ -1357,7 +1314,7 @@ async def edit_notes_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     new_notes = update.message.text.strip()
     item_id = context.user_data.get("selected_item_id", "")
     
-    result = notion_service.update_notes(item_id, new_notes)
+    result = await asyncio.to_thread(notion_service.update_notes, item_id, new_notes)
     
     if result["success"]:
         await update.message.reply_text(
@@ -1379,11 +1336,13 @@ async def confirm_delete_handler(update: Update, context: ContextTypes.DEFAULT_T
     query = update.callback_query
     await query.answer()
     
-    item_id = context.user_data.get("selected_item_id", "")
-    item_type = context.user_data.get("selected_item_type", "")
+    parsed = _parse_action(query.data)
+    if parsed is None:
+        return CONFIRM_DELETE
+    action, item_type, item_id, _ = parsed
     
-    if query.data.startswith("confirmdelete_"):
-        result = notion_service.delete_item(item_id)
+    if action == "confirmdelete":
+        result = await asyncio.to_thread(notion_service.delete_item, item_id)
         
         if result["success"]:
             await query.edit_message_text(
@@ -1399,25 +1358,8 @@ async def confirm_delete_handler(update: Update, context: ContextTypes.DEFAULT_T
         context.user_data.clear()
         return MAIN_MENU
     
-    if query.data.startswith("canceldelete_"):
-        item = notion_service.get_item_by_id(item_id)
-        if item:
-            emoji = _status_emoji(item['status'])
-            type_emoji = {"assignment": "📝", "lab": "🔬", "project": "🎯"}.get(item_type, "📝")
-            text = (
-                f"{type_emoji} *{item['name']}*\n\n"
-                f"📚 Course: {item['course_code']}\n"
-                f"📅 Due: {item['due_date']}\n"
-                f"📌 Notes: {item['notes'] if item['notes'] else 'None'}\n"
-                f"Status: {emoji} {item['status']}\n\n"
-                f"What would you like to do?"
-            )
-            await query.edit_message_text(
-                text,
-                reply_markup=item_action_keyboard(item_id[:32], item_type),
-                parse_mode="Markdown"
-            )
-        return ITEM_ACTION
+    if action == "canceldelete":
+        return await _back_to_item_action(query, context)
     
     return CONFIRM_DELETE
 
@@ -1426,6 +1368,13 @@ async def confirm_delete_handler(update: Update, context: ContextTypes.DEFAULT_T
 # UPCOMING HANDLERS
 # =============================================================================
 
+_UPCOMING_SECTIONS = (
+    ("assignments", "📝 Assignments:\n"),
+    ("labs", "🔬 Labs:\n"),
+    ("projects", "🎯 Projects:\n"),
+)
+
+
 async def upcoming_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle upcoming menu selections."""
     query = update.callback_query
@@ -1434,37 +1383,65 @@ async def upcoming_menu_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if query.data == "back_main":
         return await start(update, context)
     
-    days = int(query.data.replace("upcoming_", ""))
-    work = notion_service.get_upcoming(days)
+    if not isinstance(query.data, str):
+        return UPCOMING_MENU  # stale tuple button from an older message
+    
+    days = int(query.data.partition("_")[2])
+    work = await asyncio.to_thread(notion_service.get_upcoming, days, use_cache=True)
     
     total = len(work["assignments"]) + len(work["labs"]) + len(work["projects"])
     
     if total == 0:
         text = f"🎉 Nothing due in the next {days} days!"
     else:
-        text = f"📅 Due in the next {days} days:\n\n"
-        
-        if work["assignments"]:
-            text += "📝 Assignments:\n"
-            for a in work["assignments"]:
-                text += f"  • {a['name']} ({a['course_code']}) - {a['due_date']}\n"
-            text += "\n"
-        
-        if work["labs"]:
-            text += "🔬 Labs:\n"
-            for lab in work["labs"]:
-                text += f"  • {lab['name']} ({lab['course_code']}) - {lab['due_date']}\n"
-            text += "\n"
-        
-        if work["projects"]:
-            text += "🎯 Projects:\n"
-            for p in work["projects"]:
-                text += f"  • {p['name']} ({p['course_code']}) - {p['due_date']}\n"
+        sections = [
+            header + "".join(f"  • {i['name']} ({i['course_code']}) - {i['due_date']}\n" for i in work[key])
+            for key, header in _UPCOMING_SECTIONS
+            if work[key]
+        ]
+        text = f"📅 Due in the next {days} days:\n\n" + "\n".join(sections)
     
-    await query.edit_message_text(text, reply_markup=upcoming_menu_keyboard())
+    await _edit_if_changed(query, text, reply_markup=upcoming_menu_keyboard())
     return UPCOMING_MENU
 
 
+# Item actions that write to Notion
+_WRITE_ACTIONS = frozenset({"status", "confirmdelete"})
+
+# (chat, message, callback data) of recent write presses; the same press
+# again within the TTL is a double tap and is dropped
+_RECENT_PRESSES = TTLCache(maxsize=1024, ttl=2)
+
+
+def _is_write_action(data) -> bool:
+    """Match the callback data of a button that writes to Notion."""
+    parsed = _parse_action(data)
+    return parsed is not None and parsed[0] in _WRITE_ACTIONS
+
+
+async def drop_double_tap(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Swallow a repeated press of the same write button before it reaches Notion twice.
+    
+    Only writes are filtered: navigation buttons such as "Skip" or "Back" repeat
+    the same data on consecutive screens of the same message, and those taps
+    are real.
+    """
+    query = update.callback_query
+    message = query.message
+    key = (message.chat_id, message.message_id, query.data) if message else (query.inline_message_id, query.data)
+    if key in _RECENT_PRESSES:
+        await query.answer()
+        raise ApplicationHandlerStop
+    _RECENT_PRESSES[key] = None
+
+
+async def expired_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle buttons whose callback data is no longer cached (e.g. after a restart)."""
+    await update.callback_query.answer("⌛ This button has expired. Use /start to open the menu.", show_alert=True)
+    raise ApplicationHandlerStop
+
+
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Cancel current operation and return to main menu."""
     context.user_data.clear()
@@ -1476,6 +1453,53 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # MAIN
 # =============================================================================
 
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Process updates concurrently across chats, but one at a time per chat.
+    
+    The conversation keeps per-user state, so two button presses from the
+    same chat must not interleave; other chats shouldn't wait on them.
+    """
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # Locks live only while some update for the chat holds or awaits them
+        self._chat_locks = weakref.WeakValueDictionary()
+    
+    async def process_update(self, update: object, coroutine) -> None:
+        # Wait for the chat's turn *before* taking a concurrency slot; the base
+        # class takes the slot first, so one chat's queued updates would hold
+        # slots while waiting on its lock and starve every other chat.
+        chat = update.effective_chat if isinstance(update, Update) else None
+        chat_id = chat.id if chat else None
+        lock = self._chat_locks.get(chat_id)
+        if lock is None:
+            lock = self._chat_locks[chat_id] = asyncio.Lock()
+        async with lock:
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+    
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+    
+    async def initialize(self) -> None:
+        pass
+    
+    async def shutdown(self) -> None:
+        pass
+
+
+async def _post_shutdown(application: Application):
+    """Release the Notion connection pool when the bot stops."""
+    notion_service.close()
+
+
+_STARTUP_CHECK_TIMEOUT = 5.0
+
+# The bot only handles messages and button presses; don't ask Telegram for
+# edits, channel posts, member updates, etc.
+_ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+
 def main():
     """Start the bot."""
     # Validate config
@@ -1485,13 +1509,42 @@ def main():
         print(f"❌ Configuration error: {e}")
         return
     
-    # Test Notion connection
-    if not notion_service.test_connection():
+    # Test Notion connection, bounded so a hung Notion can't stall startup
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        connected = pool.submit(notion_service.test_connection).result(timeout=_STARTUP_CHECK_TIMEOUT)
+    except TimeoutError:
+        print(f"❌ Notion did not respond within {_STARTUP_CHECK_TIMEOUT:g} seconds.")
+        connected = False
+    finally:
+        pool.shutdown(wait=False)
+    
+    if not connected:
         print("❌ Cannot connect to Notion.")
         return
     
-    # Create application
-    app = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+    # Use the libuv event loop where it's installed (not available on Windows)
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    
+    # Create application (rate limiter queues outgoing calls to stay under
+    # Telegram's flood limits instead of hitting RetryAfter)
+    app = (
+        Application.builder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .rate_limiter(AIORateLimiter(overall_max_rate=28, max_retries=2))
+        .arbitrary_callback_data(True)
+        .concurrent_updates(PerChatUpdateProcessor(32))
+        # Concurrent handlers share a bigger pool for API calls; long polling
+        # keeps its own connection so it never competes with them
+        .request(HTTPXRequest(connection_pool_size=32, pool_timeout=5.0, connect_timeout=5.0, read_timeout=15.0))
+        .get_updates_request(HTTPXRequest(connect_timeout=5.0, read_timeout=15.0))
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
     
     # Build conversation handler
     conv_handler = ConversationHandler(
@@ -1509,15 +1562,18 @@ def main():
             
             # Assignment flow
             ADD_ASSIGNMENT_NAME: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_assignment_name),
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND,
+                    partial(add_item_name, key="assignment_name", next_state=ADD_ASSIGNMENT_COURSE),
+                ),
                 CallbackQueryHandler(back_to_add_menu, pattern="^back_add$"),
             ],
             ADD_ASSIGNMENT_COURSE: [
-                CallbackQueryHandler(add_assignment_course),
+                CallbackQueryHandler(partial(add_item_course, key="assignment_course", next_state=ADD_ASSIGNMENT_DATE)),
             ],
             ADD_ASSIGNMENT_DATE: [
                 CallbackQueryHandler(add_assignment_date),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_assignment_date_text),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, partial(add_date_text, state=ADD_ASSIGNMENT_DATE)),
             ],
             ADD_ASSIGNMENT_NOTES: [
                 CallbackQueryHandler(add_assignment_notes),
@@ -1526,15 +1582,18 @@ def main():
             
             # Lab flow
             ADD_LAB_NAME: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_lab_name),
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND,
+                    partial(add_item_name, key="lab_name", next_state=ADD_LAB_COURSE),
+                ),
                 CallbackQueryHandler(back_to_add_menu, pattern="^back_add$"),
             ],
             ADD_LAB_COURSE: [
-                CallbackQueryHandler(add_lab_course),
+                CallbackQueryHandler(partial(add_item_course, key="lab_course", next_state=ADD_LAB_DATE)),
             ],
             ADD_LAB_DATE: [
                 CallbackQueryHandler(add_lab_date),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_lab_date_text),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, partial(add_date_text, state=ADD_LAB_DATE)),
             ],
             ADD_LAB_DESCRIPTION: [
                 CallbackQueryHandler(add_lab_description),
@@ -1547,15 +1606,18 @@ def main():
             
             # Project flow
             ADD_PROJECT_NAME: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_project_name),
+                MessageHandler(
+                    filters.TEXT & ~filters.COMMAND,
+                    partial(add_item_name, key="project_name", next_state=ADD_PROJECT_COURSE),
+                ),
                 CallbackQueryHandler(back_to_add_menu, pattern="^back_add$"),
             ],
             ADD_PROJECT_COURSE: [
-                CallbackQueryHandler(add_project_course),
+                CallbackQueryHandler(partial(add_item_course, key="project_course", next_state=ADD_PROJECT_DATE)),
             ],
             ADD_PROJECT_DATE: [
                 CallbackQueryHandler(add_project_date),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, add_project_date_text),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, partial(add_date_text, state=ADD_PROJECT_DATE)),
             ],
             ADD_PROJECT_NOTES: [
                 CallbackQueryHandler(add_project_notes),
@@ -1589,13 +1651,13 @@ def main():
                 CallbackQueryHandler(list_menu_handler),
             ],
             LIST_ASSIGNMENTS_SELECT: [
-                CallbackQueryHandler(list_assignments_select_handler),
+                CallbackQueryHandler(partial(list_select_handler, state=LIST_ASSIGNMENTS_SELECT)),
             ],
             LIST_LABS_SELECT: [
-                CallbackQueryHandler(list_labs_select_handler),
+                CallbackQueryHandler(partial(list_select_handler, state=LIST_LABS_SELECT)),
             ],
             LIST_PROJECTS_SELECT: [
-                CallbackQueryHandler(list_projects_select_handler),
+                CallbackQueryHandler(partial(list_select_handler, state=LIST_PROJECTS_SELECT)),
             ],
             ITEM_ACTION: [
                 CallbackQueryHandler(item_action_handler),
@@ -1626,15 +1688,31 @@ def main():
         ],
     )
     
+    # Runs before the conversation so stale buttons never reach its handlers
+    app.add_handler(CallbackQueryHandler(drop_double_tap, pattern=_is_write_action), group=-2)
+    app.add_handler(CallbackQueryHandler(expired_button, pattern=InvalidCallbackData), group=-1)
     app.add_handler(conv_handler)
     
+    if config.WEBHOOK_URL:
+        # Telegram pushes updates to us; the webhook server owns PORT, so the
+        # health check server isn't started. The token keeps the path secret.
+        print("🚀 Bot is running with interactive menus (webhook)...")
+        app.run_webhook(
+            listen="0.0.0.0",
+            port=config.PORT,
+            url_path=config.TELEGRAM_BOT_TOKEN,
+            webhook_url=f"{config.WEBHOOK_URL.rstrip('/')}/{config.TELEGRAM_BOT_TOKEN}",
+            allowed_updates=_ALLOWED_UPDATES,
+        )
+        return
+    
     # Start web server in background thread (for Render health checks)
     web_thread = threading.Thread(target=run_web_server, daemon=True)
     web_thread.start()
     
     # Start
     print("🚀 Bot is running with interactive menus...")
-    app.run_polling(allowed_updates=Update.ALL_TYPES)
+    app.run_polling(allowed_updates=_ALLOWED_UPDATES)
 
 
 if __name__ == "__main__":
@@ -21,6 +21,11 @@ LABS_DB_ID = os.getenv("LABS_DB_ID")
 PROJECTS_DB_ID = os.getenv("PROJECTS_DB_ID")
 COURSES_DB_ID = os.getenv("COURSES_DB_ID")
 
+# Webhook Configuration (optional) - set WEBHOOK_URL to the bot's public HTTPS
+# base URL to receive updates by webhook instead of long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+PORT = int(os.getenv("PORT", "10000"))
+
 # Validate that all required environment variables are set
 def validate_config():
     """Check if all required environment variables are set"""
@@ -2,12 +2,208 @@
 Notion Service - handles all interactions with Notion API
 """
 
-from notion_client import Client
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from functools import lru_cache
+import logging
+import re
+import threading
+import time
+import httpx
 import config
 
-# Initialize Notion client
-notion = Client(auth=config.NOTION_TOKEN)
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _notion():
+    """Return the shared Notion client, importing and creating it on first use."""
+    from notion_client import Client
+
+    # One keep-alive connection pool shared by every Notion call, so handlers
+    # running in worker threads reuse TCP/TLS connections instead of reconnecting.
+    # HTTP/2 lets concurrent queries (e.g. get_upcoming) share one connection.
+    # The transport retries failed connection attempts, never sent requests.
+    transport = httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+    )
+    client = Client(auth=config.NOTION_TOKEN, client=httpx.Client(transport=transport))
+
+    # Set after construction, since Client overwrites the timeout it is given:
+    # requests fail after 10s instead of the 60s default, and connecting after 5s
+    client.client.timeout = httpx.Timeout(10.0, connect=5.0)
+    return client
+
+
+def close():
+    """Close the shared HTTP connection pool, if the client was ever created."""
+    if _notion.cache_info().currsize:
+        _notion().client.close()
+
+
+# =============================================================================
+# LIST CACHE
+# =============================================================================
+
+# Short-lived cache of list_* and get_upcoming results, so picking an item right after listing
+# doesn't query the whole database again. Cleared on every write; updates by
+# page ID clear every type, since the ID doesn't say which database it's in.
+_LIST_CACHE_TTL = 45
+_list_cache = {}  # item type -> (timestamp, items, {page id: item})
+_upcoming_cache = {}  # days -> (timestamp, upcoming dict)
+_page_cache = {}  # page id -> (timestamp, item), for pages fetched one at a time
+_list_cache_lock = threading.Lock()
+
+
+def _cache_entry(item_type: str):
+    """Return the live cache entry for item_type, or None if missing or expired."""
+    with _list_cache_lock:
+        entry = _list_cache.get(item_type)
+    if entry is None or time.monotonic() - entry[0] > _LIST_CACHE_TTL:
+        return None
+    return entry
+
+
+def _cache_get(item_type: str):
+    """Return cached items for item_type, or None if missing or expired."""
+    entry = _cache_entry(item_type)
+    return entry[1] if entry else None
+
+
+def _cache_put(item_type: str, items: list):
+    """Store freshly fetched items for item_type, indexed by page ID."""
+    by_id = {item["id"]: item for item in items}
+    with _list_cache_lock:
+        _list_cache[item_type] = (time.monotonic(), items, by_id)
+
+
+def _invalidate(item_type: str = None):
+    """Drop cached items for item_type (or every type) and all upcoming views."""
+    with _list_cache_lock:
+        if item_type is None:
+            _list_cache.clear()
+            _page_cache.clear()
+        else:
+            _list_cache.pop(item_type, None)
+        # Any write can move an item into or out of an upcoming window
+        _upcoming_cache.clear()
+
+
+# =============================================================================
+# PAGE CREATION
+# =============================================================================
+
+# Property value builders, in the format Notion expects for each property type
+def _title(value: str) -> dict:
+    return {"title": [{"text": {"content": value}}]}
+
+
+def _rich(value: str) -> dict:
+    return {"rich_text": [{"text": {"content": value}}]}
+
+
+def _date(value: str) -> dict:
+    return {"date": {"start": value}}
+
+
+def _status(value: str) -> dict:
+    return {"status": {"name": value}}
+
+
+def _number(value) -> dict:
+    return {"number": value}
+
+
+def _item_properties(name: str, course_code: str, due_date: str, notes: str, status: str) -> dict:
+    """Build the properties shared by assignments, labs and projects."""
+    return {
+        "Name": _title(name),
+        "Course Code": _rich(course_code),
+        "Due Date": _date(due_date),
+        "Notes": _rich(notes),
+        "status": _status(status),
+    }
+
+
+# Exactly YYYY-MM-DD; date.fromisoformat would also take other ISO forms such
+# as 20251220, which Notion's date property doesn't expect
+_DATE_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})", re.ASCII)
+
+
+def is_valid_date(value: str) -> bool:
+    """Check for a real YYYY-MM-DD date locally, so bad input never costs a round-trip."""
+    match = _DATE_RE.fullmatch(value) if isinstance(value, str) else None
+    if not match:
+        return False
+    try:
+        date(int(match[1]), int(match[2]), int(match[3]))
+        return True
+    except ValueError:
+        return False
+
+
+# How often a write rejected by Notion's rate limit (HTTP 429) is retried
+_RATE_LIMIT_RETRIES = 3
+
+
+def _with_retry(request, **kwargs):
+    """Call a Notion endpoint, waiting out Retry-After (or backing off) when rate limited."""
+    for attempt in range(_RATE_LIMIT_RETRIES + 1):
+        try:
+            return request(**kwargs)
+        except Exception as e:
+            # APIErrorCode is a str enum, so this avoids importing notion_client here
+            if getattr(e, "code", None) != "rate_limited" or attempt == _RATE_LIMIT_RETRIES:
+                raise
+            delay = float(e.headers.get("Retry-After", 2 ** attempt))
+            logger.warning("Rate limited by Notion, retrying in %gs", delay)
+            time.sleep(delay)
+
+
+def _create_page(item_type: str, database_id: str, properties: dict, name: str) -> dict:
+    """Create a page in database_id and report the result for item_type."""
+    due = properties.get("Due Date")
+    if due is not None and not is_valid_date(due["date"]["start"]):
+        return {"success": False, "message": f"Error adding {item_type}: invalid due date '{due['date']['start']}' (use YYYY-MM-DD)"}
+    try:
+        _with_retry(_notion().pages.create, parent={"database_id": database_id}, properties=properties)
+        _invalidate(item_type)
+        return {"success": True, "message": f"{item_type.capitalize()} '{name}' added successfully!"}
+    except Exception as e:
+        return {"success": False, "message": f"Error adding {item_type}: {str(e)}"}
+
+
+# =============================================================================
+# ITEM LISTS
+# =============================================================================
+
+# Query parameters shared by every call; notion-client only reads them, so they're never copied
+_SORT_DUE_ASC = [{"property": "Due Date", "direction": "ascending"}]
+_SORT_SEMESTER_ASC = [{"property": "Semester", "direction": "ascending"}]
+
+# Notion-side filter for the default lists, so finished work isn't downloaded and parsed
+_NOT_DONE = {"property": "status", "status": {"does_not_equal": "Done"}}
+
+
+def _list_items(item_type: str, database_id: str, use_cache: bool, include_done: bool) -> list:
+    """Fetch the named items of database_id sorted by due date (only the default view is cached)."""
+    if use_cache and not include_done:
+        items = _cache_get(item_type)
+        if items is not None:
+            return items
+    query = {"sorts": _SORT_DUE_ASC}
+    if not include_done:
+        query["filter"] = _NOT_DONE
+    try:
+        items = _named(_parse_items(_iter_pages(database_id, **query), item_type))
+        if not include_done:
+            _cache_put(item_type, items)
+        return items
+    except Exception as e:
+        logger.warning("Error listing %ss: %s", item_type, e)
+        return []
 
 
 # =============================================================================
@@ -28,43 +224,19 @@ def add_assignment(name: str, course_code: str, due_date: str, notes: str = "",
     Returns:
         dict with success status and message
     """
-    try:
-        response = notion.pages.create(
-            parent={"database_id": config.ASSIGNMENTS_DB_ID},
-            properties={
-                "Name": {
-                    "title": [{"text": {"content": name}}]
-                },
-                "Course Code": {
-                    "rich_text": [{"text": {"content": course_code}}]
-                },
-                "Due Date": {
-                    "date": {"start": due_date}
-                },
-                "Notes": {
-                    "rich_text": [{"text": {"content": notes}}]
-                },
-                "status": {
-                    "status": {"name": status}
-                }
-            }
-        )
-        return {"success": True, "message": f"Assignment '{name}' added successfully!"}
-    except Exception as e:
-        return {"success": False, "message": f"Error adding assignment: {str(e)}"}
+    properties = _item_properties(name, course_code, due_date, notes, status)
+    return _create_page("assignment", config.ASSIGNMENTS_DB_ID, properties, name)
 
 
-def list_assignments() -> list:
-    """Get all assignments sorted by due date."""
-    try:
-        response = notion.databases.query(
-            database_id=config.ASSIGNMENTS_DB_ID,
-            sorts=[{"property": "Due Date", "direction": "ascending"}]
-        )
-        return _parse_items(response["results"], "assignment")
-    except Exception as e:
-        print(f"Error listing assignments: {e}")
-        return []
+def list_assignments(use_cache: bool = False, include_done: bool = False) -> list:
+    """
+    Get all named assignments sorted by due date.
+    
+    Args:
+        use_cache: Reuse a result fetched in the last _LIST_CACHE_TTL seconds
+        include_done: Also return assignments whose status is "Done"
+    """
+    return _list_items("assignment", config.ASSIGNMENTS_DB_ID, use_cache, include_done)
 
 
 # =============================================================================
@@ -86,46 +258,20 @@ def add_lab(name: str, course_code: str, due_date: str, description: str = "", n
     Returns:
         dict with success status and message
     """
-    try:
-        response = notion.pages.create(
-            parent={"database_id": config.LABS_DB_ID},
-            properties={
-                "Name": {
-                    "title": [{"text": {"content": name}}]
-                },
-                "Course Code": {
-                    "rich_text": [{"text": {"content": course_code}}]
-                },
-                "Due Date": {
-                    "date": {"start": due_date}
-                },
-                "Description": {
-                    "rich_text": [{"text": {"content": description}}]
-                },
-                "Notes": {
-                    "rich_text": [{"text": {"content": notes}}]
-                },
-                "status": {
-                    "status": {"name": status}
-                }
-            }
-        )
-        return {"success": True, "message": f"Lab '{name}' added successfully!"}
-    except Exception as e:
-        return {"success": False, "message": f"Error adding lab: {str(e)}"}
+    properties = _item_properties(name, course_code, due_date, notes, status)
+    properties["Description"] = _rich(description)
+    return _create_page("lab", config.LABS_DB_ID, properties, name)
 
 
-def list_labs() -> list:
-    """Get all labs sorted by due date."""
-    try:
-        response = notion.databases.query(
-            database_id=config.LABS_DB_ID,
-            sorts=[{"property": "Due Date", "direction": "ascending"}]
-        )
-        return _parse_items(response["results"], "lab")
-    except Exception as e:
-        print(f"Error listing labs: {e}")
-        return []
+def list_labs(use_cache: bool = False, include_done: bool = False) -> list:
+    """
+    Get all named labs sorted by due date.
+    
+    Args:
+        use_cache: Reuse a result fetched in the last _LIST_CACHE_TTL seconds
+        include_done: Also return labs whose status is "Done"
+    """
+    return _list_items("lab", config.LABS_DB_ID, use_cache, include_done)
 
 
 # =============================================================================
@@ -146,43 +292,19 @@ def add_project(name: str, course_code: str, due_date: str, notes: str = "", sta
     Returns:
         dict with success status and message
     """
-    try:
-        response = notion.pages.create(
-            parent={"database_id": config.PROJECTS_DB_ID},
-            properties={
-                "Name": {
-                    "title": [{"text": {"content": name}}]
-                },
-                "Course Code": {
-                    "rich_text": [{"text": {"content": course_code}}]
-                },
-                "Due Date": {
-                    "date": {"start": due_date}
-                },
-                "Notes": {
-                    "rich_text": [{"text": {"content": notes}}]
-                },
-                "status": {
-                    "status": {"name": status}
-                }
-            }
-        )
-        return {"success": True, "message": f"Project '{name}' added successfully!"}
-    except Exception as e:
-        return {"success": False, "message": f"Error adding project: {str(e)}"}
+    properties = _item_properties(name, course_code, due_date, notes, status)
+    return _create_page("project", config.PROJECTS_DB_ID, properties, name)
 
 
-def list_projects() -> list:
-    """Get all projects sorted by due date."""
-    try:
-        response = notion.databases.query(
-            database_id=config.PROJECTS_DB_ID,
-            sorts=[{"property": "Due Date", "direction": "ascending"}]
-        )
-        return _parse_items(response["results"], "project")
-    except Exception as e:
-        print(f"Error listing projects: {e}")
-        return []
+def list_projects(use_cache: bool = False, include_done: bool = False) -> list:
+    """
+    Get all named projects sorted by due date.
+    
+    Args:
+        use_cache: Reuse a result fetched in the last _LIST_CACHE_TTL seconds
+        include_done: Also return projects whose status is "Done"
+    """
+    return _list_items("project", config.PROJECTS_DB_ID, use_cache, include_done)
 
 
 # =============================================================================
@@ -203,54 +325,36 @@ def add_course(name: str, course_code: str, semester: int, professor: str = "",
     Returns:
         dict with success status and message
     """
-    try:
-        response = notion.pages.create(
-            parent={"database_id": config.COURSES_DB_ID},
-            properties={
-                "Name": {
-                    "title": [{"text": {"content": name}}]
-                },
-                "Course Code": {
-                    "rich_text": [{"text": {"content": course_code}}]
-                },
-                "Semester": {
-                    "number": semester
-                },
-                "Professor": {
-                    "rich_text": [{"text": {"content": professor}}]
-                },
-                "ECTS": {
-                    "number": ects
-                }
-            }
-        )
-        return {"success": True, "message": f"Course '{name}' added successfully!"}
-    except Exception as e:
-        return {"success": False, "message": f"Error adding course: {str(e)}"}
+    properties = {
+        "Name": _title(name),
+        "Course Code": _rich(course_code),
+        "Semester": _number(semester),
+        "Professor": _rich(professor),
+        "ECTS": _number(ects),
+    }
+    return _create_page("course", config.COURSES_DB_ID, properties, name)
 
 
 def list_courses() -> list:
-    """Get all courses sorted by semester."""
+    """Get all named courses sorted by semester."""
     try:
-        response = notion.databases.query(
-            database_id=config.COURSES_DB_ID,
-            sorts=[{"property": "Semester", "direction": "ascending"}]
-        )
-        
         courses = []
-        for page in response["results"]:
+        for page in _iter_pages(
+            database_id=config.COURSES_DB_ID,
+            sorts=_SORT_SEMESTER_ASC
+        ):
             props = page["properties"]
             courses.append({
                 "id": page["id"],
                 "name": _get_title(props, "Name"),
                 "course_code": _get_text(props, "Course Code"),
-                "semester": props.get("Semester", {}).get("number", 0),
+                "semester": props.get("Semester", {}).get("number") or 0,
                 "professor": _get_text(props, "Professor"),
-                "ects": props.get("ECTS", {}).get("number", 0)
+                "ects": props.get("ECTS", {}).get("number") or 0
             })
-        return courses
+        return _named(courses)
     except Exception as e:
-        print(f"Error listing courses: {e}")
+        logger.warning("Error listing courses: %s", e)
         return []
 
 
@@ -258,6 +362,47 @@ def list_courses() -> list:
 # UPDATE OPERATIONS
 # =============================================================================
 
+def update_item(page_id: str, status: str = None, due_date: str = None, course_code: str = None, notes: str = None) -> dict:
+    """
+    Update several properties of any item in a single Notion request.
+    
+    Args:
+        page_id: Notion page ID
+        status: New status ("Not started", "In progress", or "Done")
+        due_date: New due date in YYYY-MM-DD format
+        course_code: New course code
+        notes: New notes text
+    
+    Returns:
+        dict with success status and message
+    """
+    properties = {}
+    fields = []  # (name used in errors, success message) per property being updated
+    if status is not None:
+        properties["status"] = _status(status)
+        fields.append(("status", f"Status updated to '{status}'"))
+    if due_date is not None:
+        if not is_valid_date(due_date):
+            return {"success": False, "message": f"Error updating due date: invalid date '{due_date}' (use YYYY-MM-DD)"}
+        properties["Due Date"] = _date(due_date)
+        fields.append(("due date", f"Due date updated to '{due_date}'"))
+    if course_code is not None:
+        properties["Course Code"] = _rich(course_code)
+        fields.append(("course", f"Course updated to '{course_code}'"))
+    if notes is not None:
+        properties["Notes"] = _rich(notes)
+        fields.append(("notes", "Notes updated"))
+    if not properties:
+        return {"success": False, "message": "Nothing to update"}
+    
+    try:
+        _with_retry(_notion().pages.update, page_id=page_id, properties=properties)
+        _invalidate()
+        return {"success": True, "message": ", ".join(message for _, message in fields)}
+    except Exception as e:
+        return {"success": False, "message": f"Error updating {', '.join(name for name, _ in fields)}: {str(e)}"}
+
+
 def update_status(page_id: str, new_status: str) -> dict:
     """
     Update the status of any item (assignment, lab, or project).
@@ -269,18 +414,7 @@ def update_status(page_id: str, new_status: str) -> dict:
     Returns:
         dict with success status and message
     """
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={
-                "status": {
-                    "status": {"name": new_status}
-                }
-            }
-        )
-        return {"success": True, "message": f"Status updated to '{new_status}'"}
-    except Exception as e:
-        return {"success": False, "message": f"Error updating status: {str(e)}"}
+    return update_item(page_id, status=new_status)
 
 
 def update_due_date(page_id: str, new_date: str) -> dict:
@@ -294,18 +428,7 @@ def update_due_date(page_id: str, new_date: str) -> dict:
     Returns:
         dict with success status and message
     """
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={
-                "Due Date": {
-                    "date": {"start": new_date}
-                }
-            }
-        )
-        return {"success": True, "message": f"Due date updated to '{new_date}'"}
-    except Exception as e:
-        return {"success": False, "message": f"Error updating due date: {str(e)}"}
+    return update_item(page_id, due_date=new_date)
 
 
 def update_course(page_id: str, new_course: str) -> dict:
@@ -319,18 +442,7 @@ def update_course(page_id: str, new_course: str) -> dict:
     Returns:
         dict with success status and message
     """
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={
-                "Course Code": {
-                    "rich_text": [{"text": {"content": new_course}}]
-                }
-            }
-        )
-        return {"success": True, "message": f"Course updated to '{new_course}'"}
-    except Exception as e:
-        return {"success": False, "message": f"Error updating course: {str(e)}"}
+    return update_item(page_id, course_code=new_course)
 
 
 def update_notes(page_id: str, new_notes: str) -> dict:
@@ -344,18 +456,7 @@ def update_notes(page_id: str, new_notes: str) -> dict:
     Returns:
         dict with success status and message
     """
-    try:
-        notion.pages.update(
-            page_id=page_id,
-            properties={
-                "Notes": {
-                    "rich_text": [{"text": {"content": new_notes}}]
-                }
-            }
-        )
-        return {"success": True, "message": "Notes updated"}
-    except Exception as e:
-        return {"success": False, "message": f"Error updating notes: {str(e)}"}
+    return update_item(page_id, notes=new_notes)
 
 
 def delete_item(page_id: str) -> dict:
@@ -369,39 +470,37 @@ def delete_item(page_id: str) -> dict:
         dict with success status and message
     """
     try:
-        notion.pages.update(
-            page_id=page_id,
-            archived=True
-        )
+        _with_retry(_notion().pages.update, page_id=page_id, archived=True)
+        _invalidate()
         return {"success": True, "message": "Item deleted"}
     except Exception as e:
         return {"success": False, "message": f"Error deleting item: {str(e)}"}
 
 
-def get_item_by_id(page_id: str) -> dict:
+def get_item_by_id(page_id: str, use_cache: bool = False) -> dict:
     """
     Get a single item by its page ID.
     
     Args:
         page_id: Notion page ID
+        use_cache: Reuse the page if it was fetched in the last _LIST_CACHE_TTL seconds
     
     Returns:
         dict with item details or None
     """
+    if use_cache:
+        with _list_cache_lock:
+            entry = _page_cache.get(page_id)
+        if entry is not None and time.monotonic() - entry[0] <= _LIST_CACHE_TTL:
+            return entry[1]
     try:
-        page = notion.pages.retrieve(page_id=page_id)
-        props = page["properties"]
-        
-        return {
-            "id": page["id"],
-            "name": _get_title(props, "Name"),
-            "course_code": _get_text(props, "Course Code"),
-            "due_date": _get_date(props, "Due Date"),
-            "notes": _get_text(props, "Notes"),
-            "status": _get_status(props, "status")
-        }
+        page = _notion().pages.retrieve(page_id=page_id)
+        item = _parse_items([page], "item")[0]
+        with _list_cache_lock:
+            _page_cache[page_id] = (time.monotonic(), item)
+        return item
     except Exception as e:
-        print(f"Error getting item: {e}")
+        logger.warning("Error getting item: %s", e)
         return None
 
 
@@ -409,25 +508,66 @@ def get_item_by_id(page_id: str) -> dict:
 # QUERY OPERATIONS
 # =============================================================================
 
-def get_upcoming(days: int = 7) -> dict:
+def get_cached_item(item_type: str, page_id: str) -> dict:
+    """
+    Get an item from the cached list of its type.
+    
+    If the cache has expired or doesn't hold the item, the page is fetched
+    directly by ID (and kept for repeat views) rather than re-listing the
+    whole database.
+    
+    Args:
+        item_type: "assignment", "lab", or "project"
+        page_id: Notion page ID
+    
+    Returns:
+        dict with item details or None
+    """
+    entry = _cache_entry(item_type)
+    if entry is not None:
+        item = entry[2].get(page_id)
+        if item is not None:
+            return item
+    return get_item_by_id(page_id, use_cache=True)
+
+
+# (key in the get_upcoming result, database ID, item type) for each database it queries
+_UPCOMING_DATABASES = (
+    ("assignments", config.ASSIGNMENTS_DB_ID, "assignment"),
+    ("labs", config.LABS_DB_ID, "lab"),
+    ("projects", config.PROJECTS_DB_ID, "project"),
+)
+
+
+@lru_cache(maxsize=8)
+def _upcoming_filter(today: date, days: int) -> dict:
+    """Build the Due Date filter for today..today+days (shared; don't mutate)."""
+    return {
+        "and": [
+            {"property": "Due Date", "date": {"on_or_after": today.isoformat()}},
+            {"property": "Due Date", "date": {"on_or_before": (today + timedelta(days=days)).isoformat()}}
+        ]
+    }
+
+
+def get_upcoming(days: int = 7, use_cache: bool = False) -> dict:
     """
     Get all upcoming work within specified days.
     
     Args:
         days: Number of days to look ahead
+        use_cache: Reuse a result fetched in the last _LIST_CACHE_TTL seconds
     
     Returns:
         dict with assignments, labs, and projects
     """
-    today = datetime.now().date().isoformat()
-    future_date = (datetime.now().date() + timedelta(days=days)).isoformat()
+    if use_cache:
+        with _list_cache_lock:
+            entry = _upcoming_cache.get(days)
+        if entry is not None and time.monotonic() - entry[0] <= _LIST_CACHE_TTL:
+            return entry[1]
     
-    date_filter = {
-        "and": [
-            {"property": "Due Date", "date": {"on_or_after": today}},
-            {"property": "Due Date", "date": {"on_or_before": future_date}}
-        ]
-    }
+    date_filter = _upcoming_filter(date.today(), days)
     
     upcoming = {
         "assignments": [],
@@ -435,23 +575,28 @@ def get_upcoming(days: int = 7) -> dict:
         "projects": []
     }
     
-    # Query each database
-    db_configs = [
-        ("assignments", config.ASSIGNMENTS_DB_ID, "assignment"),
-        ("labs", config.LABS_DB_ID, "lab"),
-        ("projects", config.PROJECTS_DB_ID, "project")
-    ]
-    
-    for key, db_id, item_type in db_configs:
+    def _query(db_config: tuple) -> bool:
+        key, db_id, item_type = db_config
         try:
-            response = notion.databases.query(
+            pages = _iter_pages(
                 database_id=db_id,
                 filter=date_filter,
-                sorts=[{"property": "Due Date", "direction": "ascending"}]
+                sorts=_SORT_DUE_ASC
             )
-            upcoming[key] = _parse_items(response["results"], item_type)
+            upcoming[key] = _parse_items(pages, item_type)
+            return True
         except Exception as e:
-            print(f"Error querying {key}: {e}")
+            logger.warning("Error querying %s: %s", key, e)
+            return False
+    
+    # The three databases are independent, so query them concurrently
+    with ThreadPoolExecutor(max_workers=len(_UPCOMING_DATABASES)) as pool:
+        ok = all(list(pool.map(_query, _UPCOMING_DATABASES)))
+    
+    # Only cache complete results, so a failed query isn't served as "nothing due"
+    if ok:
+        with _list_cache_lock:
+            _upcoming_cache[days] = (time.monotonic(), upcoming)
     
     return upcoming
 
@@ -462,55 +607,77 @@ def get_upcoming(days: int = 7) -> dict:
 
 def _get_title(props: dict, prop_name: str) -> str:
     """Extract title property value."""
-    try:
-        return props[prop_name]["title"][0]["text"]["content"]
-    except (KeyError, IndexError):
-        return "Untitled"
+    value = props.get(prop_name, {}).get("title")
+    return value[0]["plain_text"] if value else "Untitled"
 
 
 def _get_text(props: dict, prop_name: str) -> str:
     """Extract rich_text property value."""
-    try:
-        return props[prop_name]["rich_text"][0]["text"]["content"]
-    except (KeyError, IndexError):
-        return ""
+    value = props.get(prop_name, {}).get("rich_text")
+    return value[0]["plain_text"] if value else ""
 
 
-def _get_date(props: dict, prop_name: str) -> str:
-    """Extract date property value."""
-    try:
-        return props[prop_name]["date"]["start"]
-    except (KeyError, TypeError):
-        return "No date"
-
-
-def _get_status(props: dict, prop_name: str) -> str:
-    """Extract status property value."""
-    try:
-        return props[prop_name]["status"]["name"]
-    except (KeyError, TypeError):
-        return "Not started"
-
-
-def _parse_items(results: list, item_type: str) -> list:
-    """Parse Notion query results into clean dictionaries."""
+def _iter_pages(database_id: str, **kwargs):
+    """
+    Query a database and yield every result page, following pagination.
+    
+    Results are yielded as each batch of 100 arrives, so the caller parses
+    them without first collecting the whole raw response in memory.
+    """
+    response = {"has_more": True, "next_cursor": None}
+    while response["has_more"]:
+        if response["next_cursor"]:
+            kwargs["start_cursor"] = response["next_cursor"]
+        response = _notion().databases.query(database_id=database_id, page_size=100, **kwargs)
+        yield from response["results"]
+
+
+def _named(items: list) -> list:
+    """Drop items without a real name (empty or "Untitled" pages)."""
+    return [item for item in items if item["name"] and item["name"] != "Untitled"]
+
+
+# Notion property type -> value extractor (None for an empty value)
+_EXTRACTORS = {
+    "title": lambda v: v[0]["plain_text"] if v else None,
+    "rich_text": lambda v: v[0]["plain_text"] if v else None,
+    "date": lambda v: v["start"] if v else None,
+    "status": lambda v: v["name"] if v else None,
+}
+
+# Notion property name -> (item key, value when missing or empty)
+_ITEM_FIELDS = {
+    "Name": ("name", "Untitled"),
+    "Course Code": ("course_code", ""),
+    "Due Date": ("due_date", "No date"),
+    "Notes": ("notes", ""),
+    "status": ("status", "Not started"),
+}
+_LAB_FIELDS = {**_ITEM_FIELDS, "Description": ("description", "")}
+
+
+def _parse_items(results, item_type: str) -> list:
+    """Parse Notion query results (any iterable of pages) into clean dictionaries."""
+    # Labs also carry a description
+    fields = _LAB_FIELDS if item_type == "lab" else _ITEM_FIELDS
+    defaults = dict(fields.values())
+    # Bind globals to locals once; this loop runs for every page of every list
+    extractors = _EXTRACTORS
     items = []
+    append = items.append
     for page in results:
-        props = page["properties"]
-        item = {
-            "id": page["id"],
-            "name": _get_title(props, "Name"),
-            "course_code": _get_text(props, "Course Code"),
-            "due_date": _get_date(props, "Due Date"),
-            "notes": _get_text(props, "Notes"),
-            "status": _get_status(props, "status")
-        }
-        
-        # Add description for labs
-        if item_type == "lab":
-            item["description"] = _get_text(props, "Description")
-        
-        items.append(item)
+        item = {"id": page["id"], **defaults}
+        # One pass over the page's properties, skipping the ones we don't show
+        for name, prop in page["properties"].items():
+            field = fields.get(name)
+            if field is None:
+                continue
+            prop_type = prop["type"]
+            extract = extractors.get(prop_type)
+            value = extract(prop[prop_type]) if extract else None
+            if value is not None:
+                item[field[0]] = value
+        append(item)
     return items
 
 
@@ -521,7 +688,7 @@ def _parse_items(results: list, item_type: str) -> list:
 def test_connection() -> bool:
     """Test Notion API connection."""
     try:
-        notion.databases.retrieve(database_id=config.ASSIGNMENTS_DB_ID)
+        _notion().databases.retrieve(database_id=config.ASSIGNMENTS_DB_ID)
         print("✅ Connected to Notion successfully!")
         return True
     except Exception as e: